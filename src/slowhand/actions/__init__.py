@@ -1,47 +1,63 @@
+from importlib import import_module
+
 from slowhand.errors import SlowhandException
+from slowhand.plugins import get_plugin_actions
+
+from .base import Action, ActionParams, AsyncAction
 
-from .abort import Abort
-from .base import Action, ActionParams
-from .git import GitClone, GitCommitPushBranch
-from .github import GithubCreatePr, GithubEditPr
-from .jira import JiraCreateMoTicket
-from .print import Print
-from .revault_deploy import RevaultFindDeployVersions, RevaultUpdateDeployVersions
-from .revault_deps import RevaultRevertMobileDeps, RevaultRevertPinnedDeps
-from .setup import SetupGh, SetupGit, SetupJira, SetupJobsDirs
-from .shell import Shell
-from .slack import SlackSendMessage
-from .version import ComputeVersion
-
-__all__ = ("Action", "ActionParams", "create_action")
-
-_BUILTIN_ACTIONS: dict[str, type[Action]] = {
-    f"actions/{action_class.name}": action_class
-    for action_class in (
-        Abort,
-        ComputeVersion,
-        GitClone,
-        GitCommitPushBranch,
-        GithubCreatePr,
-        GithubEditPr,
-        JiraCreateMoTicket,
-        Print,
-        RevaultFindDeployVersions,
-        RevaultUpdateDeployVersions,
-        RevaultRevertMobileDeps,
-        RevaultRevertPinnedDeps,
-        SetupGit,
-        SetupGh,
-        SetupJira,
-        SetupJobsDirs,
-        Shell,
-        SlackSendMessage,
-    )
+__all__ = ("Action", "ActionParams", "AsyncAction", "create_action")
+
+# Action modules are only imported when an action is created: some of them import
+# heavy dependencies (e.g. `jira`, `slack_sdk`).
+_BUILTIN_ACTIONS: dict[str, str] = {
+    "actions/abort": "slowhand.actions.abort:Abort",
+    "actions/compute-version": "slowhand.actions.version:ComputeVersion",
+    "actions/git-clone": "slowhand.actions.git:GitClone",
+    "actions/git-commit-push-branch": "slowhand.actions.git:GitCommitPushBranch",
+    "actions/github-create-pr": "slowhand.actions.github:GithubCreatePr",
+    "actions/github-edit-pr": "slowhand.actions.github:GithubEditPr",
+    "actions/jira-create-mo-ticket": "slowhand.actions.jira:JiraCreateMoTicket",
+    "actions/print": "slowhand.actions.print:Print",
+    "actions/revault-find-deploy-versions": (
+        "slowhand.actions.revault_deploy:RevaultFindDeployVersions"
+    ),
+    "actions/revault-update-deploy-versions": (
+        "slowhand.actions.revault_deploy:RevaultUpdateDeployVersions"
+    ),
+    "actions/revault-revert-mobile-deps": (
+        "slowhand.actions.revault_deps:RevaultRevertMobileDeps"
+    ),
+    "actions/revault-revert-pinned-deps": (
+        "slowhand.actions.revault_deps:RevaultRevertPinnedDeps"
+    ),
+    "actions/setup-git": "slowhand.actions.setup:SetupGit",
+    "actions/setup-gh": "slowhand.actions.setup:SetupGh",
+    "actions/setup-jira": "slowhand.actions.setup:SetupJira",
+    "actions/setup-jobs-dirs": "slowhand.actions.setup:SetupJobsDirs",
+    "actions/shell": "slowhand.actions.shell:Shell",
+    "actions/slack-send-message": "slowhand.actions.slack:SlackSendMessage",
 }
 
+_action_classes: dict[str, type[Action]] = {}
 
-def create_action(name: str) -> Action:
-    action_class = _BUILTIN_ACTIONS.get(name)
+
+def _import_action_class(name: str) -> type[Action]:
+    action_class = _action_classes.get(name)
     if action_class is None:
-        raise SlowhandException(f"Cannot find action {name}")
-    return action_class()
+        # Builtin actions can't be overridden by plugins.
+        target = _BUILTIN_ACTIONS.get(name) or get_plugin_actions().get(name)
+        if target is None:
+            raise SlowhandException(f"Cannot find action {name}")
+        module_name, _, class_name = target.partition(":")
+        try:
+            action_class = getattr(import_module(module_name), class_name)
+        except (ImportError, AttributeError) as exc:
+            raise SlowhandException(f"Cannot import action {name} ({target}): {exc}")
+        if not isinstance(action_class, type) or not issubclass(action_class, Action):
+            raise SlowhandException(f"Action {name} ({target}) is not an Action")
+        _action_classes[name] = action_class
+    return action_class
+
+
+def create_action(name: str) -> Action:
+    return _import_action_class(name)()
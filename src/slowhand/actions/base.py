@@ -1,8 +1,10 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import override
 
 from slowhand.context import Context, SimpleValue
 
-ActionParams = dict[str, None | str | int | bool]
+ActionParams = dict[str, None | str | int | bool | list[str]]
 
 
 class Action(ABC):
@@ -13,3 +15,31 @@ class Action(ABC):
         self, params: ActionParams, *, context: Context, dry_run: bool
     ) -> dict[str, SimpleValue] | None:
         pass
+
+    async def run_async(
+        self, params: ActionParams, *, context: Context, dry_run: bool
+    ) -> dict[str, SimpleValue] | None:
+        # By default, run the blocking action in a worker thread.
+        return await asyncio.to_thread(
+            self.run, params, context=context, dry_run=dry_run
+        )
+
+
+class AsyncAction(Action):
+    """
+    Action natively implemented as a coroutine, e.g. to spawn subprocesses without
+    blocking the event loop.
+    """
+
+    @override
+    def run(
+        self, params: ActionParams, *, context: Context, dry_run: bool
+    ) -> dict[str, SimpleValue] | None:
+        return asyncio.run(self.run_async(params, context=context, dry_run=dry_run))
+
+    @override
+    @abstractmethod
+    async def run_async(
+        self, params: ActionParams, *, context: Context, dry_run: bool
+    ) -> dict[str, SimpleValue] | None:
+        pass
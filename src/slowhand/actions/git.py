@@ -1,24 +1,33 @@
+import asyncio
 from functools import partial
-from typing import override
+from typing import Literal, override
 
 from pydantic import BaseModel, Field
 
 from slowhand.errors import SlowhandException
 from slowhand.logging import get_logger
-from slowhand.utils import random_name, run_command
+from slowhand.mirrors import clone_with_mirror, get_mirror_dir
+from slowhand.utils import random_name, run_command_async
 
-from .base import Action
+from .base import AsyncAction
 
 logger = get_logger(__name__)
 
 
-class GitClone(Action):
+class GitClone(AsyncAction):
     name = "git-clone"
 
     class Params(BaseModel):
         repo: str = Field(pattern=r"^[\w\-]+/[\w\-]+$")
         fetch_depth: int | None = Field(None, alias="fetch-depth", gt=0)
         new_branch: str | None = Field(None, alias="new-branch")
+        # Clone with a local mirror of the repo as reference (see `slowhand.mirrors`).
+        mirror: bool = False
+        # Partial clone: download blobs (or trees) lazily, when checked out.
+        filter: Literal["blob:none", "tree:0"] | None = None
+        # Only check out these directories (cone mode sparse checkout).
+        sparse_paths: list[str] = Field(default_factory=list, alias="sparse-paths")
+        single_branch: bool = Field(False, alias="single-branch")
 
         @property
         def bare_name(self) -> str:
@@ -33,16 +42,55 @@ class GitClone(Action):
             opts = []
             if self.fetch_depth is not None:
                 opts.extend(["--depth", str(self.fetch_depth)])
+            if self.filter:
+                opts.append(f"--filter={self.filter}")
+            if self.sparse_paths:
+                opts.append("--sparse")
+            if self.single_branch:
+                opts.append("--single-branch")
             return opts
 
+        @property
+        def sparse_dirs(self) -> list[str]:
+            # Cone mode works with directories: `foo/bar/**` is the same as `foo/bar`.
+            return [path.removesuffix("**").strip("/") for path in self.sparse_paths]
+
     @override
-    def run(self, params, *, context, dry_run):
+    async def run_async(self, params, *, context, dry_run):
         params = self.Params(**params)
         repo_dir = str(context.run_dir / random_name(params.bare_name))
-        run_command("git", "clone", params.github_url, repo_dir, *params.clone_opts)
-        head_hash = run_command("git", "rev-parse", "HEAD", cwd=repo_dir)
+        if params.mirror:
+            await asyncio.to_thread(
+                clone_with_mirror,
+                params.github_url,
+                get_mirror_dir(params.repo),
+                repo_dir,
+                params.clone_opts,
+            )
+        else:
+            await run_command_async(
+                "git",
+                "clone",
+                params.github_url,
+                repo_dir,
+                *params.clone_opts,
+                stream=True,
+            )
+        if params.sparse_paths:
+            await run_command_async(
+                "git",
+                "sparse-checkout",
+                "set",
+                "--cone",
+                "--",
+                *params.sparse_dirs,
+                cwd=repo_dir,
+            )
+        head_hash = await run_command_async("git", "rev-parse", "HEAD", cwd=repo_dir)
         if params.new_branch:
-            run_command("git", "checkout", "-b", params.new_branch, cwd=repo_dir)
+            await run_command_async(
+                "git", "checkout", "-b", params.new_branch, cwd=repo_dir
+            )
         return {
             "repo_dir": repo_dir,
             "head_hash": head_hash,
@@ -51,7 +99,7 @@ class GitClone(Action):
         }
 
 
-class GitCommitPushBranch(Action):
+class GitCommitPushBranch(AsyncAction):
     name = "git-commit-push-branch"
 
     class Params(BaseModel):
@@ -60,31 +108,33 @@ class GitCommitPushBranch(Action):
         branch: str
 
     @override
-    def run(self, params, *, context, dry_run):
+    async def run_async(self, params, *, context, dry_run):
         params = self.Params(**params)
         if params.branch in ("main", "master"):
             raise SlowhandException(f"Pushing to {params.branch} branch is disallowed")
 
-        run_in_repo = partial(run_command, cwd=params.repo_dir)
+        run_in_repo = partial(run_command_async, cwd=params.repo_dir)
 
         try:
-            run_in_repo("git", "diff", "--quiet")
-            run_in_repo("git", "diff", "--cached", "--quiet")
+            await run_in_repo("git", "diff", "--quiet")
+            await run_in_repo("git", "diff", "--cached", "--quiet")
             has_changes = False
         except Exception:
             has_changes = True
         if not has_changes:
             raise SlowhandException(f"No changes to commit in: {params.repo_dir}")
 
-        current_branch = run_in_repo("git", "rev-parse", "--abbrev-ref", "HEAD")
+        current_branch = await run_in_repo("git", "rev-parse", "--abbrev-ref", "HEAD")
         if current_branch.strip() != params.branch:
             logger.info("Checking out new branch: %s", params.branch)
-            run_in_repo("git", "checkout", "-b", params.branch)
+            await run_in_repo("git", "checkout", "-b", params.branch)
 
-        run_in_repo("git", "add", "-A")
-        run_in_repo("git", "commit", "-m", params.message)
+        await run_in_repo("git", "add", "-A")
+        await run_in_repo("git", "commit", "-m", params.message)
         if not dry_run:
-            run_in_repo("git", "push", "--set-upstream", "origin", params.branch)
+            await run_in_repo(
+                "git", "push", "--set-upstream", "origin", params.branch, stream=True
+            )
         else:
             logger.warning("Dry-run: git push ...")
         return {}
@@ -5,14 +5,14 @@ from pydantic import BaseModel, Field
 
 from slowhand.errors import SlowhandException
 from slowhand.logging import get_logger
-from slowhand.utils import run_command
+from slowhand.utils import run_command_async
 
-from .base import Action
+from .base import AsyncAction
 
 logger = get_logger(__name__)
 
 
-class GithubCreatePr(Action):
+class GithubCreatePr(AsyncAction):
     name = "github-create-pr"
 
     class Params(BaseModel):
@@ -27,7 +27,7 @@ class GithubCreatePr(Action):
             return f"https://github.com/{self.repo}/pull/"
 
     @override
-    def run(self, params, *, context, dry_run):
+    async def run_async(self, params, *, context, dry_run):
         params = self.Params(**params)
         opts = [
             "--repo",
@@ -42,7 +42,7 @@ class GithubCreatePr(Action):
             params.body,
         ]
         if not dry_run:
-            output = run_command("gh", "pr", "create", *opts)
+            output = await run_command_async("gh", "pr", "create", *opts)
             match_obj = re.search(
                 re.escape(params.pr_link_prefix) + r"(?P<pr_number>\d+)",
                 output,
@@ -63,7 +63,7 @@ class GithubCreatePr(Action):
         }
 
 
-class GithubEditPr(Action):
+class GithubEditPr(AsyncAction):
     name = "github-edit-pr"
 
     class Params(BaseModel):
@@ -72,7 +72,7 @@ class GithubEditPr(Action):
         body: str | None = None
 
     @override
-    def run(self, params, *, context, dry_run):
+    async def run_async(self, params, *, context, dry_run):
         params = self.Params(**params)
         opts = []
         if params.title:
@@ -82,7 +82,7 @@ class GithubEditPr(Action):
         if not opts:
             raise SlowhandException(f"Nothing to edit for PR: {params.pr_link}")
         if not dry_run:
-            run_command("gh", "pr", "edit", params.pr_link, *opts)
+            await run_command_async("gh", "pr", "edit", params.pr_link, *opts)
         else:
             logger.warning("Dry-run: gh pr edit ...")
         return {}
@@ -4,9 +4,10 @@ from typing import Any, override
 from jira import JIRA
 from pydantic import BaseModel, Field
 
-from slowhand.config import settings
+from slowhand.config import get_settings
 from slowhand.errors import SlowhandException
 from slowhand.logging import get_logger
+from slowhand.tracing import span
 
 from .base import Action
 
@@ -52,16 +53,19 @@ class JiraCreateMoTicket(Action):
     def run(self, params, *, context, dry_run):
         params = self.Params(**params)
 
+        settings = get_settings()
         jira_server = settings.jira.server
         jira_email = settings.jira.email
         jira_api_token = settings.jira.api_token
         if not jira_server or not jira_email or not jira_api_token:
             raise SlowhandException("JIRA server, email or API token is not configured")
 
-        jira = JIRA(
-            server=jira_server,
-            basic_auth=(jira_email, jira_api_token.get_secret_value()),
-        )
+        # The client has no public hook for its requests: trace the API calls.
+        with span("Jira: connect", "http", server=jira_server):
+            jira = JIRA(
+                server=jira_server,
+                basic_auth=(jira_email, jira_api_token.get_secret_value()),
+            )
 
         component_version = f"{params.component}-{params.version}"
         ticket_fields = {
@@ -103,7 +107,8 @@ class JiraCreateMoTicket(Action):
 
         if not dry_run:
             logger.info("Creating MO ticket to deploy: %s", component_version)
-            mo_ticket = jira.create_issue(fields=ticket_fields)
+            with span("Jira: create issue", "http", project="MO"):
+                mo_ticket = jira.create_issue(fields=ticket_fields)
             issue_key = mo_ticket.key
             logger.info("MO ticket created: %s", issue_key)
         else:
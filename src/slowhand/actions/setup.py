@@ -5,7 +5,7 @@ from typing import override
 from jira import JIRA
 from rich.prompt import Prompt
 
-from slowhand.config import Settings, settings
+from slowhand.config import Settings, get_settings
 from slowhand.errors import SlowhandException
 from slowhand.logging import get_logger, ok, primary
 from slowhand.utils import run_command
@@ -104,6 +104,7 @@ class SetupJira(Action):
 
     @override
     def run(self, params, *, context, dry_run):
+        settings = get_settings()
         jira_server = settings.jira.server
         jira_email = settings.jira.email
         if not jira_server:
@@ -143,6 +144,7 @@ class SetupJobsDirs(Action):
 
     @override
     def run(self, params, *, context, dry_run):
+        settings = get_settings()
         if not settings.jobs_dirs:
             settings.jobs_dirs = [Path.home() / "slowhand"]
             save_user_settings(settings)
@@ -1,12 +1,13 @@
+import asyncio
 from pathlib import Path
 from typing import override
 
 from pydantic import BaseModel, Field, field_validator
 
 from slowhand.logging import get_logger
-from slowhand.utils import random_name, run_shell_script
+from slowhand.utils import random_name, run_shell_script_async
 
-from .base import Action
+from .base import AsyncAction
 
 logger = get_logger(__name__)
 
@@ -26,7 +27,7 @@ def _load_output_file(output_filepath: Path) -> dict[str, str]:
     return output
 
 
-class Shell(Action):
+class Shell(AsyncAction):
     name = "shell"
 
     class Params(BaseModel):
@@ -44,13 +45,43 @@ class Shell(Action):
                     raise ValueError(f"Path is not a directory: {value}")
             return value
 
-    @override
-    def run(self, params, *, context, dry_run):
+    def _prepare(
+        self, params, *, context, dry_run
+    ) -> tuple["Shell.Params", Path, dict[str, str]]:
         params = self.Params(**params)
-        cwd = params.working_dir or context.run_dir
         output_filepath = context.run_dir / random_name("output")
-        extra_env = {"OUTPUT": str(output_filepath)}
         if dry_run:
             logger.warning("Dry-run is enabled but ignored in action: %s", self.name)
-        run_shell_script(params.script, cwd=cwd, extra_env=extra_env)
+        return params, output_filepath, {"OUTPUT": str(output_filepath)}
+
+    @override
+    def run(self, params, *, context, dry_run):
+        if context.shell_sessions is None:
+            return super().run(params, context=context, dry_run=dry_run)
+        # Sessions are blocking: run the script without an event loop.
+        params, output_filepath, extra_env = self._prepare(
+            params, context=context, dry_run=dry_run
+        )
+        context.shell_sessions.run_shell_script(
+            params.script,
+            cwd=params.working_dir or context.run_dir,
+            extra_env=extra_env,
+        )
+        return _load_output_file(output_filepath)
+
+    @override
+    async def run_async(self, params, *, context, dry_run):
+        params, output_filepath, extra_env = self._prepare(
+            params, context=context, dry_run=dry_run
+        )
+        cwd = params.working_dir or context.run_dir
+        if context.shell_sessions is not None:
+            await asyncio.to_thread(
+                context.shell_sessions.run_shell_script,
+                params.script,
+                cwd=cwd,
+                extra_env=extra_env,
+            )
+        else:
+            await run_shell_script_async(params.script, cwd=cwd, extra_env=extra_env)
         return _load_output_file(output_filepath)
@@ -0,0 +1,134 @@
+import csv
+import json
+import shlex
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+from slowhand.errors import SlowhandException
+from slowhand.loader import load_job
+from slowhand.logging import configure_logging, get_logger, log_prefix
+from slowhand.runner import JobResult, RunOptions, run_job
+from slowhand.utils import parse_key_values
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class BatchRun:
+    job_id: str
+    inputs: dict[str, str]
+
+    @property
+    def label(self) -> str:
+        return " ".join(
+            [self.job_id] + [f"{key}={value}" for key, value in self.inputs.items()]
+        )
+
+
+def parse_batch_run(spec: str) -> BatchRun:
+    """
+    Parse a run in `<job_id> <key>=<value> ...` format (shell quoting is supported).
+    """
+    tokens = shlex.split(spec)
+    if not tokens:
+        raise SlowhandException("Empty run")
+    try:
+        inputs = parse_key_values(tokens[1:])
+    except ValueError as exc:
+        raise SlowhandException(str(exc))
+    return BatchRun(job_id=tokens[0], inputs=inputs)
+
+
+def _to_input_value(value: object) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def load_batch_file(file: Path) -> list[BatchRun]:
+    """
+    Load runs from either:
+
+    - a JSONL file, one `{"job_id": ..., "inputs": {...}}` object per line;
+    - a CSV file, with a `job_id` column and one column per input. Empty cells are
+      treated as missing inputs.
+    """
+    runs: list[BatchRun] = []
+    with file.open("r", newline="") as f:
+        if file.suffix == ".csv":
+            for row in csv.DictReader(f):
+                job_id = row.pop("job_id", None)
+                if not job_id:
+                    raise SlowhandException(f"Missing job_id in row: {row}")
+                inputs = {key: value for key, value in row.items() if value}
+                runs.append(BatchRun(job_id=job_id, inputs=inputs))
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                job_id = data.get("job_id")
+                if not job_id:
+                    raise SlowhandException(f"Missing job_id in line: {line}")
+                inputs = {
+                    key: _to_input_value(value)
+                    for key, value in (data.get("inputs") or {}).items()
+                    if value is not None
+                }
+                runs.append(BatchRun(job_id=job_id, inputs=inputs))
+    return runs
+
+
+def validate_batch_runs(runs: list[BatchRun]) -> None:
+    """
+    Fail early on unknown jobs or invalid inputs, before running anything.
+    """
+    for run in runs:
+        try:
+            load_job(run.job_id).parse_inputs(run.inputs)
+        except SlowhandException as exc:
+            raise SlowhandException(f"{run.label}: {exc}")
+
+
+def _run_in_worker(run: BatchRun, options: RunOptions, clean: bool) -> JobResult:
+    with log_prefix(run.label):
+        job = load_job(run.job_id)
+        return run_job(job, run.inputs, options=options, clean=clean)
+
+
+def run_batch(
+    runs: list[BatchRun],
+    *,
+    concurrency: int,
+    options: RunOptions | None = None,
+    clean: bool = True,
+) -> list[JobResult]:
+    """
+    Run jobs concurrently on a process pool, each with its own context and run dir.
+    Results are returned in the order of `runs`, which should be validated first with
+    `validate_batch_runs()`.
+    """
+    options = options or RunOptions()
+    results: dict[int, JobResult] = {}
+    with ProcessPoolExecutor(
+        max_workers=concurrency, initializer=configure_logging
+    ) as executor:
+        futures = {
+            executor.submit(_run_in_worker, run, options, clean): index
+            for index, run in enumerate(runs)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as exc:
+                logger.error("Run %s crashed: %s", runs[index].label, exc)
+                results[index] = JobResult(
+                    job_id=runs[index].job_id,
+                    run_id="",
+                    succeeded=False,
+                    duration=0.0,
+                    error=str(exc),
+                )
+    return [results[index] for index in range(len(runs))]
@@ -0,0 +1,168 @@
+"""
+Content-addressed cache of step outputs, stored in `~/.slowhand/cache`.
+
+Only use it for steps whose outputs depend on nothing but their params and declared
+files: e.g. outputs pointing into the run dir of a previous run are not reusable.
+
+Keys don't depend on where runs happen: paths into the run dir are hashed relative to
+it, and files matching relative patterns relative to the base dir. Steps working in
+their run dir (e.g. in a cloned repo) can then hit the cache across runs.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+from slowhand.config import ensure_app_user_dir, get_settings
+from slowhand.context import SimpleValue
+from slowhand.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Saving outputs evicts the cache at most once per interval, as it scans all entries.
+# The cache may then exceed its max size until the next eviction or `slowhand gc`.
+_AUTO_EVICT_INTERVAL = 3600  # in seconds
+
+
+def _get_cache_dir() -> Path:
+    return ensure_app_user_dir() / "cache"
+
+
+def _hash_file(file: Path) -> str:
+    digest = hashlib.sha256()
+    with file.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _relativize(value: Any, run_dir: str) -> Any:
+    if isinstance(value, str):
+        return value.replace(run_dir, "<run_dir>")
+    if isinstance(value, Mapping):
+        return {k: _relativize(v, run_dir) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_relativize(item, run_dir) for item in value]
+    return value
+
+
+def compute_cache_key(
+    uses: str,
+    params: Mapping[str, Any],
+    *,
+    key: str | None = None,
+    files: list[str] | None = None,
+    base_dir: Path | None = None,
+    run_dir: Path | None = None,
+) -> str:
+    base_dir = base_dir or Path.cwd()
+    file_hashes: dict[str, str] = {}
+    for pattern in files or []:
+        if Path(pattern).is_absolute():
+            matched = [Path(pattern)] if Path(pattern).is_file() else []
+        else:
+            matched = sorted(base_dir.glob(pattern))
+        if not matched:
+            file_hashes[pattern] = "<missing>"
+        for file in matched:
+            if file.is_file():
+                name = (
+                    file.relative_to(base_dir)
+                    if file.is_relative_to(base_dir)
+                    else file
+                )
+                file_hashes[str(name)] = _hash_file(file)
+
+    data = {"uses": uses, "params": params, "key": key, "files": file_hashes}
+    if run_dir is not None:
+        data = _relativize(data, str(run_dir))
+    payload = json.dumps(data, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _get_entry_file(cache_key: str) -> Path:
+    return _get_cache_dir() / cache_key[:2] / f"{cache_key}.json"
+
+
+def load_cached_outputs(cache_key: str) -> dict[str, SimpleValue] | None:
+    entry_file = _get_entry_file(cache_key)
+    try:
+        with entry_file.open("r") as f:
+            mtime = os.fstat(f.fileno()).st_mtime
+            outputs = json.load(f)["outputs"]
+        if time.time() - mtime > get_settings().cache.max_age_days * 86400:
+            return None
+        os.utime(entry_file)  # mark as recently used
+    except (OSError, ValueError, KeyError):
+        return None
+    return outputs
+
+
+def save_cached_outputs(cache_key: str, outputs: Mapping[str, SimpleValue]) -> None:
+    entry_file = _get_entry_file(cache_key)
+    entry_file.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp file, as threads and processes may save the same key at once.
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f"{cache_key}.", suffix=".tmp", dir=entry_file.parent
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"outputs": dict(outputs)}, f)
+        os.replace(tmp_name, entry_file)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    _auto_evict_cache()
+
+
+def _auto_evict_cache() -> None:
+    stamp_file = _get_cache_dir() / "last-evicted"
+    try:
+        if time.time() - stamp_file.stat().st_mtime < _AUTO_EVICT_INTERVAL:
+            return
+    except FileNotFoundError:
+        pass
+    stamp_file.touch()
+    evict_cache()
+
+
+def evict_cache() -> int:
+    """
+    Delete expired entries, then least recently used ones until the cache fits in its
+    max size. Return the number of deleted entries.
+    """
+    cache_dir = _get_cache_dir()
+    now = time.time()
+    settings = get_settings()
+    max_age = settings.cache.max_age_days * 86400
+    max_size = settings.cache.max_size_mb * 1024 * 1024
+
+    deleted = 0
+    entries: list[tuple[float, int, Path]] = []
+    for entry_file in cache_dir.glob("*/*.json"):
+        try:
+            stat = entry_file.stat()
+        except FileNotFoundError:
+            continue  # deleted by a concurrent run
+        if now - stat.st_mtime > max_age:
+            entry_file.unlink(missing_ok=True)
+            deleted += 1
+        else:
+            entries.append((stat.st_mtime, stat.st_size, entry_file))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, entry_file in sorted(entries):
+        if total_size <= max_size:
+            break
+        entry_file.unlink(missing_ok=True)
+        total_size -= size
+        deleted += 1
+
+    if deleted:
+        logger.debug("Evicted %d cache entries", deleted)
+    return deleted
@@ -0,0 +1,97 @@
+"""
+On-disk catalog of validated jobs, so that job files are only parsed and validated
+again when they change.
+
+Entries are keyed by file path, and are fresh if the file has the same mtime and size,
+or else the same content hash (e.g. after a checkout touching the file).
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from slowhand.config import ensure_app_user_dir
+from slowhand.logging import get_logger
+from slowhand.models import Job
+from slowhand.version import VERSION
+
+logger = get_logger(__name__)
+
+# Bump it when the job models change, to invalidate catalogs of dev versions.
+_CATALOG_FORMAT = 4
+
+
+def _get_catalog_file() -> Path:
+    return ensure_app_user_dir() / "catalog" / "jobs.json"
+
+
+class JobCatalog:
+    def __init__(self, catalog_file: Path) -> None:
+        self._catalog_file = catalog_file
+        self._version = f"{VERSION}/{_CATALOG_FORMAT}"
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._changed = False
+        try:
+            data = json.loads(catalog_file.read_text())
+            if data.get("version") == self._version:
+                self._entries = data["entries"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Ignoring invalid job catalog %s: %s", catalog_file, exc)
+
+    def load_job(self, job_file: Path, parse: Callable[[bytes], Job]) -> Job:
+        """
+        Load a job from the catalog if it's fresh, or else parse the job file with
+        `parse` and save the job to the catalog.
+        """
+        key = str(job_file.absolute())
+        stat = job_file.stat()
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            return Job.construct_validated(entry["job"])
+
+        content = job_file.read_bytes()
+        content_hash = hashlib.sha256(content).hexdigest()
+        if entry is not None and entry["sha256"] == content_hash:
+            job = Job.construct_validated(entry["job"])
+        else:
+            job = parse(content)
+        self._entries[key] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": content_hash,
+            "job": job.model_dump(mode="json"),
+        }
+        self._changed = True
+        return job
+
+    def save(self) -> None:
+        if not self._changed:
+            return
+        self._catalog_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self._catalog_file.with_name(
+            f"{self._catalog_file.name}.{os.getpid()}.tmp"
+        )
+        data = {"version": self._version, "entries": self._entries}
+        tmp_file.write_text(json.dumps(data, separators=(",", ":")))
+        tmp_file.replace(self._catalog_file)
+        self._changed = False
+
+
+_catalog: JobCatalog | None = None
+
+
+def get_catalog() -> JobCatalog:
+    global _catalog
+    catalog_file = _get_catalog_file()
+    if _catalog is None or _catalog._catalog_file != catalog_file:
+        _catalog = JobCatalog(catalog_file)
+    return _catalog
@@ -0,0 +1,90 @@
+"""
+Thin client of the slowhand daemon (`slowhand serve`). It only uses the standard
+library, so that it starts much faster than the full CLI.
+
+Protocol: the client sends a JSON request on a single line, then the daemon streams
+JSON messages, one per line: `log` messages, then a final `result` (or `error`).
+"""
+
+import argparse
+import json
+import socket
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+# Same as `config.ensure_app_user_dir()`, without importing the settings.
+DEFAULT_SOCKET_PATH = Path.home() / ".slowhand" / "daemon.sock"
+
+
+def send_request(
+    request: dict[str, Any], *, socket_path: Path = DEFAULT_SOCKET_PATH
+) -> Iterator[dict[str, Any]]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="slowhand-client", description="Run jobs on the slowhand daemon"
+    )
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ping", help="Check that the daemon is running")
+    for name in ("run", "resume"):
+        command = commands.add_parser(name, help=f"{name.capitalize()} a job")
+        command.add_argument("job_id")
+        if name == "run":
+            command.add_argument(
+                "-I", "--input", dest="inputs", action="append", default=[]
+            )
+        else:
+            command.add_argument("--run-id")
+        command.add_argument("--dry-run", action="store_true")
+        command.add_argument("--no-clean", dest="clean", action="store_false")
+        command.add_argument("--max-parallel", type=int, default=1)
+        command.add_argument("--async", dest="use_async", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(argv)
+    request = {key: value for key, value in vars(args).items() if key != "socket"}
+    if args.command == "run":
+        # Parsed like `utils.parse_key_values`.
+        inputs = {}
+        for arg in args.inputs:
+            key, sep, value = arg.partition("=")
+            if not sep:
+                print(f"Input must be in format <key>=<value>: {arg}", file=sys.stderr)
+                return 2
+            inputs[key] = value
+        request["inputs"] = inputs
+
+    try:
+        for message in send_request(request, socket_path=args.socket):
+            match message["type"]:
+                case "log":
+                    print(message["text"], flush=True)
+                case "result":
+                    return 0 if message["succeeded"] else 1
+                case "error":
+                    print(f"Error: {message['error']}", file=sys.stderr)
+                    return 1
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(
+            f"Daemon is not running on {args.socket}: start it with `slowhand serve`",
+            file=sys.stderr,
+        )
+        return 2
+    print("Connection to the daemon was closed", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Shell completion of job IDs and job inputs, e.g. `slowhand run <TAB>` or
+`slowhand run my-job -I <TAB>`. Register it in bash (or zsh with `bashcompinit`) with:
+
+    eval "$(slowhand-complete)"
+
+Completion must be instant, so this module only uses the standard library: it reads a
+small index of job IDs and input names (`~/.slowhand/completion.json`), instead of
+loading the settings and the jobs. The index is updated when job files are added,
+removed or changed; only changed files are read again, with PyYAML but without
+validating the jobs. The settings are only loaded when they may have changed.
+"""
+
+import json
+import os
+import shlex
+import sys
+from pathlib import Path
+from typing import Any
+
+# Same as `config._APP_USER_DIR`, without importing the settings.
+_APP_USER_DIR = Path.home() / ".slowhand"
+
+_BUILTIN_JOBS_DIR = Path(__file__).with_name("jobs")
+
+# Bump it when the format of the index changes.
+_INDEX_FORMAT = 1
+
+# Keep it in sync with the commands of `slowhand.main`.
+COMMANDS = (
+    "config",
+    "version",
+    "info",
+    "gc",
+    "jobs",
+    "show",
+    "plan",
+    "run",
+    "resume",
+    "run-many",
+    "serve",
+)
+
+_JOB_COMMANDS = ("show", "plan", "run", "resume")
+
+_INPUT_COMMANDS = ("plan", "run")
+
+_INPUT_OPTIONS = ("-I", "--input")
+
+_PROG_NAMES = ("slowhand", "slow")
+
+
+def _get_index_file() -> Path:
+    return _APP_USER_DIR / "completion.json"
+
+
+def _get_settings_fingerprint() -> list[str | int | None]:
+    # Jobs dirs are set by an env var or by the config file.
+    try:
+        config_mtime_ns: int | None = (_APP_USER_DIR / "config.json").stat().st_mtime_ns
+    except OSError:
+        config_mtime_ns = None
+    return [os.environ.get("SLOWHAND_JOBS_DIRS"), config_mtime_ns]
+
+
+def _load_jobs_dirs() -> list[str]:
+    from slowhand.config import get_settings
+
+    return [str(jobs_dir) for jobs_dir in get_settings().jobs_dirs]
+
+
+def _scan_job_files(jobs_dirs: list[str]) -> list[os.DirEntry[str]]:
+    job_files: list[os.DirEntry[str]] = []
+    for jobs_dir in jobs_dirs:
+        try:
+            with os.scandir(jobs_dir) as entries:
+                job_files.extend(
+                    entry
+                    for entry in entries
+                    if entry.name.endswith(".yaml") and entry.is_file()
+                )
+        except OSError:
+            continue
+    return job_files
+
+
+def _read_input_names(job_file: str) -> list[str]:
+    import yaml
+
+    try:
+        with open(job_file, "rb") as f:
+            data = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+        return [str(name) for name in data.get("inputs") or {}]
+    except Exception:
+        return []  # not a valid job: still complete its ID
+
+
+def _save_index(index_file: Path, index: dict[str, Any]) -> None:
+    try:
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps(index, separators=(",", ":")))
+        tmp_file.replace(index_file)
+    except OSError:
+        pass  # completion still works, only slower
+
+
+def load_index() -> dict[str, list[str]]:
+    """
+    Return input names of all jobs, by job ID, updating the index if needed.
+    """
+    index_file = _get_index_file()
+    try:
+        index = json.loads(index_file.read_text())
+    except (OSError, ValueError):
+        index = {}
+    settings_fingerprint = _get_settings_fingerprint()
+    if (
+        index.get("format") != _INDEX_FORMAT
+        or index.get("settings") != settings_fingerprint
+    ):
+        index = {
+            "format": _INDEX_FORMAT,
+            "settings": settings_fingerprint,
+            "jobs_dirs": _load_jobs_dirs(),
+            "files": {},
+        }
+
+    # User jobs take precedence over builtin jobs, like in `loader.find_job_source`.
+    job_files = _scan_job_files([*index["jobs_dirs"], str(_BUILTIN_JOBS_DIR)])
+    old_entries: dict[str, Any] = index["files"]
+    entries: dict[str, Any] = {}
+    jobs: dict[str, list[str]] = {}
+    for job_file in job_files:
+        stat = job_file.stat()
+        entry = old_entries.get(job_file.path)
+        if entry is None or entry[:2] != [stat.st_mtime_ns, stat.st_size]:
+            entry = [stat.st_mtime_ns, stat.st_size, _read_input_names(job_file.path)]
+        entries[job_file.path] = entry
+        jobs.setdefault(job_file.name.removesuffix(".yaml"), entry[2])
+
+    if entries != old_entries or not index_file.exists():
+        _save_index(index_file, index | {"files": entries})
+    return jobs
+
+
+def complete_job_ids(incomplete: str) -> list[str]:
+    return sorted(job_id for job_id in load_index() if job_id.startswith(incomplete))
+
+
+def complete_inputs(job_id: str, incomplete: str) -> list[str]:
+    if "=" in incomplete:
+        return []  # completing the value: not known
+    names = load_index().get(job_id, [])
+    return [f"{name}=" for name in names if name.startswith(incomplete)]
+
+
+def complete(words: list[str], incomplete: str) -> list[str]:
+    """
+    Return completions of the `incomplete` word, given the preceding words of the
+    command line (without the program name).
+    """
+    if not words:
+        return [command for command in COMMANDS if command.startswith(incomplete)]
+    command, *args = words
+    if command not in _JOB_COMMANDS or incomplete.startswith("-"):
+        return []
+
+    positionals = []
+    expects_input = False
+    for arg in args:
+        if expects_input:
+            expects_input = False
+        elif arg in _INPUT_OPTIONS:
+            expects_input = True
+        elif not arg.startswith("-"):
+            positionals.append(arg)
+
+    if expects_input:
+        if command in _INPUT_COMMANDS and positionals:
+            return complete_inputs(positionals[0], incomplete)
+        return []
+    if not positionals:
+        return complete_job_ids(incomplete)
+    return []
+
+
+def _split_command_line(line: str) -> tuple[list[str], str]:
+    try:
+        words = shlex.split(line)
+    except ValueError:  # e.g. an unclosed quote
+        words = line.split()
+    if not line or line[-1].isspace():
+        words.append("")
+    return words[:-1], words[-1]
+
+
+def main() -> int:
+    line = os.environ.get("COMP_LINE")
+    if line is None:
+        # Not called by the shell: print the registration script.
+        print(f"complete -o default -C slowhand-complete {' '.join(_PROG_NAMES)}")
+        return 0
+    point = int(os.environ.get("COMP_POINT", len(line)))
+    words, incomplete = _split_command_line(line[:point])
+    for completion in complete(words[1:], incomplete):
+        print(completion)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
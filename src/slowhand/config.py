@@ -1,4 +1,5 @@
 import os
+from functools import cache
 from pathlib import Path
 
 from pydantic import BaseModel, SecretStr
@@ -42,12 +43,18 @@ class SlackSettings(BaseModel):
     my_member_id: str | None = None
 
 
+class CacheSettings(BaseModel):
+    max_size_mb: int = 256
+    max_age_days: int = 30
+
+
 class Settings(BaseSettings):
     debug: bool = False
     jobs_dirs: list[Path] = []
     github: GithubSettings = GithubSettings()
     jira: JiraSettings = JiraSettings()
     slack: SlackSettings = SlackSettings()
+    cache: CacheSettings = CacheSettings()
 
     model_config = SettingsConfigDict(
         env_prefix="SLOWHAND_",
@@ -114,4 +121,9 @@ def _load_settings() -> Settings:
     return settings
 
 
-settings = _load_settings()
+@cache
+def get_settings() -> Settings:
+    """
+    Load settings on first use.
+    """
+    return _load_settings()
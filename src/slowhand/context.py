@@ -1,15 +1,20 @@
+import copy
 import json
-import re
 import shutil
 import tempfile
+import threading
+from collections.abc import Iterator
+from contextlib import ExitStack
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Mapping, Self, TypeAlias, cast
 
 from slowhand.config import ensure_app_user_dir
 from slowhand.errors import SlowhandException
+from slowhand.journal import Journal, read_journal
 from slowhand.logging import get_logger
-from slowhand.utils import random_name
+from slowhand.template import Template, VariableRef, compile_templates, parse_variable
+from slowhand.utils import ShellSessionPool, file_lock, random_name
 
 logger = get_logger(__name__)
 
@@ -17,18 +22,6 @@ SimpleValue: TypeAlias = str | bool | int | None
 StateNode: TypeAlias = SimpleValue | dict[str, "StateNode"]
 StateStore: TypeAlias = dict[str, StateNode]
 
-# Format is `${{ foo.bar }}` to be distinguished from a normal shell variable (`$foobar`).
-_VAR_REGEX = re.compile(r"\${{([^}]+)}}")
-
-_VAR_NAME_REGEX = re.compile(
-    r"^(?:"
-    r"meta\.[\w-]+"
-    r"|inputs\.[\w-]+"
-    r"|outputs\.[\w-]+"
-    r"|steps\.[\w-]+\.outputs\.[\w-]+"
-    r")$"
-)
-
 _META_JOB_ID = "meta.job_id"
 _META_RUN_ID = "meta.run_id"
 _META_RUN_DIR = "meta.run_dir"
@@ -74,8 +67,64 @@ def _get_state_node(state: StateStore, name: str) -> StateNode:
     return current.get(leaf_key)
 
 
-def _get_checkpoint_file() -> Path:
-    return ensure_app_user_dir() / "checkpoint.json"
+def _get_runs_dir() -> Path:
+    return ensure_app_user_dir() / "runs"
+
+
+def _get_journal_file(run_id: str) -> Path:
+    return _get_runs_dir() / run_id / "journal.jsonl"
+
+
+def _get_run_lock_file(run_id: str) -> Path:
+    return _get_runs_dir() / run_id / "lock"
+
+
+def _is_run_in_progress(run_id: str) -> bool:
+    try:
+        with file_lock(_get_run_lock_file(run_id), blocking=False):
+            return False
+    except BlockingIOError:
+        return True
+
+
+def _replay_journal(journal_file: Path) -> StateStore:
+    state: StateStore | None = None
+    for record in read_journal(journal_file):
+        if "snapshot" in record:
+            state = record["snapshot"]
+        elif state is not None and "set" in record:
+            _set_state_node(state, record["set"], record["value"])
+        else:
+            raise SlowhandException(f"Invalid journal record in {journal_file}")
+    if state is None:
+        raise SlowhandException(f"Empty journal: {journal_file}")
+    return state
+
+
+def _read_journal_job_id(journal_file: Path) -> str | None:
+    try:
+        # The first record is always a snapshot, which holds the meta variables.
+        record = next(read_journal(journal_file), None)
+    except (OSError, ValueError):
+        return None
+    if record is None or not isinstance(record.get("snapshot"), dict):
+        return None
+    job_id = _get_state_node(record["snapshot"], _META_JOB_ID)
+    return job_id if isinstance(job_id, str) else None
+
+
+def _iter_step_metrics(
+    steps: StateStore, prefix: str
+) -> Iterator[tuple[str, Mapping[str, SimpleValue]]]:
+    for key, node in steps.items():
+        if (prefix and key in ("outputs", "metrics")) or not isinstance(node, dict):
+            continue
+        step_id = f"{prefix}{key}"
+        metrics = node.get("metrics")
+        if isinstance(metrics, dict):
+            yield step_id, cast(Mapping[str, SimpleValue], metrics)
+        # Instances of a matrix step.
+        yield from _iter_step_metrics(node, f"{step_id}.")
 
 
 class Context:
@@ -93,6 +142,13 @@ class Context:
                     f"Invalid state: missing required meta variable: {meta_name}"
                 )
         self._state = state
+        # Steps may run concurrently and save their outputs from worker threads.
+        self._lock = threading.RLock()
+        self._matrix: dict[str, SimpleValue] = {}
+        self._journal: Journal | None = None
+        self._run_lock: ExitStack | None = None
+        # Set by the runner if the job runs shell steps in persistent sessions.
+        self.shell_sessions: ShellSessionPool | None = None
 
     @property
     def job_id(self) -> str:
@@ -111,24 +167,54 @@ class Context:
         value = self.resolve_variable(_META_START_TIME)
         return datetime.fromisoformat(value)
 
+    def with_matrix(self, matrix: Mapping[str, SimpleValue]) -> Self:
+        """
+        Return a context sharing the same state, where `matrix.*` variables resolve to
+        the given values.
+        """
+        context = copy.copy(self)
+        context._matrix = self._matrix | dict(matrix)
+        return context
+
     def has_step_outputs(self, step_id: str) -> bool:
         outputs = _get_state_node(self._state, f"steps.{step_id}.outputs")
         return outputs is not None
 
+    def _save_state_node(self, name: str, value: StateNode) -> None:
+        with self._lock:
+            _set_state_node(self._state, name, value)
+            if self._journal is not None:
+                self._journal.append({"set": name, "value": value})
+
     def save_inputs(self, inputs: Mapping[str, SimpleValue]) -> None:
         logger.debug("Saving inputs", extra=inputs)
-        _set_state_node(self._state, "inputs", dict(inputs))
+        self._save_state_node("inputs", dict(inputs))
 
     def save_outputs(self, outputs: Mapping[str, SimpleValue]) -> None:
         logger.debug("Saving outputs", extra=outputs)
-        _set_state_node(self._state, "outputs", dict(outputs))
+        self._save_state_node("outputs", dict(outputs))
 
     def save_step_outputs(
         self, step_id: str, outputs: Mapping[str, SimpleValue] | None
     ) -> None:
         outputs = outputs or {}
         logger.debug("Saving step outputs of %s", step_id, extra=outputs)
-        _set_state_node(self._state, f"steps.{step_id}.outputs", dict(outputs))
+        self._save_state_node(f"steps.{step_id}.outputs", dict(outputs))
+
+    def save_step_metrics(
+        self, step_id: str, metrics: Mapping[str, SimpleValue]
+    ) -> None:
+        self._save_state_node(f"steps.{step_id}.metrics", dict(metrics))
+
+    def get_step_metrics(self) -> dict[str, Mapping[str, SimpleValue]]:
+        """
+        Return metrics of the steps which have run, by step ID, in order of completion.
+        """
+        with self._lock:
+            steps = _get_state_node(self._state, "steps")
+            if not isinstance(steps, dict):
+                return {}
+            return dict(_iter_step_metrics(steps, ""))
 
     def get_outputs(self) -> Mapping[str, SimpleValue]:
         outputs = _get_state_node(self._state, "outputs") or {}
@@ -142,25 +228,53 @@ class Context:
         return cast(Mapping[str, SimpleValue], outputs)
 
     def resolve(self, input: Any) -> Any:
-        if isinstance(input, str):
-            return _VAR_REGEX.sub(lambda m: self.resolve_variable(m.group(1)), input)
-        if isinstance(input, dict):
-            return dict((key, self.resolve(value)) for key, value in input.items())
-        if isinstance(input, list):
-            return [self.resolve(item) for item in input]
-        return input
+        return self.render(compile_templates(input))
+
+    def render(self, compiled: Any) -> Any:
+        """
+        Render templates compiled with `compile_templates`.
+        """
+        if isinstance(compiled, Template):
+            return "".join(
+                segment if isinstance(segment, str) else self._resolve_ref(segment)
+                for segment in compiled.segments
+            )
+        if isinstance(compiled, dict):
+            return {key: self.render(value) for key, value in compiled.items()}
+        if isinstance(compiled, list):
+            return [self.render(item) for item in compiled]
+        return compiled
 
     def resolve_variable(self, var_name: str) -> str:
-        var_name = var_name.strip()
-        if not _VAR_NAME_REGEX.match(var_name):
-            raise SlowhandException(f"Invalid variable name: {var_name}")
-        value = _get_state_node(self._state, var_name)
+        return self._resolve_ref(parse_variable(var_name))
+
+    def _resolve_ref(self, ref: VariableRef) -> str:
+        value = self.lookup_variable(ref)
+        return str(value) if value is not None else ""
+
+    def lookup_variable(self, ref: VariableRef) -> SimpleValue:
+        value: StateNode
+        if ref.keys[0] == "matrix":
+            if ref.keys[1] not in self._matrix:
+                raise SlowhandException(f"Unknown matrix variable: {ref.name}")
+            value = self._matrix[ref.keys[1]]
+        else:
+            value = self._state
+            for key in ref.keys:
+                if not isinstance(value, dict):
+                    raise SlowhandException(
+                        f"Invalid value type at {key}: {type(value).__name__}"
+                    )
+                value = value.get(key)
+                if value is None:
+                    break
         if not _is_simple_value(value):
             raise SlowhandException(f"Invalid variable value: {type(value).__name__}")
-        return str(value) if value is not None else ""
+        return cast(SimpleValue, value)
 
     def dump_state_json(self) -> str:
-        return json.dumps(self._state, indent=2)
+        with self._lock:
+            return json.dumps(self._state, indent=2)
 
     def teardown(self):
         run_dir = self.run_dir
@@ -168,22 +282,83 @@ class Context:
             logger.info("Deleting run directory: %s", run_dir)
             shutil.rmtree(run_dir)
 
+    def _acquire_run_lock(self) -> None:
+        if self._run_lock is not None:
+            return
+        run_lock = ExitStack()
+        try:
+            run_lock.enter_context(
+                file_lock(_get_run_lock_file(self.run_id), blocking=False)
+            )
+        except BlockingIOError:
+            raise SlowhandException(f"Run {self.run_id} is in progress") from None
+        self._run_lock = run_lock
+
+    def _release_run_lock(self) -> None:
+        if self._run_lock is not None:
+            self._run_lock.close()
+            self._run_lock = None
+
+    def start_journal(self) -> None:
+        """
+        Persist the state to the journal of the run, and every change after that. If
+        the journal exists already, it is compacted into a single snapshot. The run is
+        locked until its checkpoint is saved or deleted.
+        """
+        with self._lock:
+            self._acquire_run_lock()
+            if self._journal is None:
+                self._journal = Journal(_get_journal_file(self.run_id))
+            self._journal.rewrite([{"snapshot": self._state}])
+
     def save_checkpoint(self) -> str:
-        checkpoint_file = _get_checkpoint_file()
-        checkpoint_file.write_text(json.dumps(self._state, indent=2))
-        return str(checkpoint_file)
+        with self._lock:
+            if self._journal is None:
+                self.start_journal()
+            assert self._journal is not None
+            self._journal.close()
+            self._release_run_lock()
+            return str(self._journal.journal_file)
 
     def delete_checkpoint(self) -> None:
-        checkpoint_file = _get_checkpoint_file()
-        if checkpoint_file.is_file():
-            checkpoint_file.unlink()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.delete()
+                self._journal = None
+            self._release_run_lock()
+            shutil.rmtree(_get_runs_dir() / self.run_id, ignore_errors=True)
 
     @classmethod
-    def load_checkpoint(cls) -> Self:
-        checkpoint_file = _get_checkpoint_file()
-        if not checkpoint_file.is_file():
-            raise SlowhandException(f"{checkpoint_file} is not a file")
-        with checkpoint_file.open("r") as f:
-            context_state = json.load(f)
-        context = cls("<unused-job-id>", state=context_state)
+    def load_checkpoint(cls, job_id: str, *, run_id: str | None = None) -> Self:
+        """
+        Load the checkpoint of a run, by replaying its journal, and keep journaling to
+        it. By default, load the latest run of the job which is not in progress.
+        """
+        runs_dir = _get_runs_dir()
+        if run_id is not None:
+            journal_file = _get_journal_file(run_id)
+            if not journal_file.is_file():
+                raise SlowhandException(f"No checkpoint found for run {run_id}")
+            if _read_journal_job_id(journal_file) != job_id:
+                raise SlowhandException(f"Run {run_id} is not a run of job {job_id}")
+        else:
+            journal_files = sorted(
+                runs_dir.glob("*/journal.jsonl"),
+                key=lambda f: f.stat().st_mtime,
+                reverse=True,
+            )
+            latest_journal_file = next(
+                (
+                    f
+                    for f in journal_files
+                    if _read_journal_job_id(f) == job_id
+                    and not _is_run_in_progress(f.parent.name)
+                ),
+                None,
+            )
+            if latest_journal_file is None:
+                raise SlowhandException(f"No checkpoint found for job {job_id}")
+            journal_file = latest_journal_file
+        context = cls(job_id, state=_replay_journal(journal_file))
+        context.start_journal()
         return context
@@ -0,0 +1,153 @@
+"""
+Long-lived daemon running jobs on behalf of the thin client (`slowhand.client`), over
+a unix socket. It keeps the interpreter, the imported actions and the job catalog
+warm: jobs are only parsed again when their files change.
+
+Jobs run on a thread pool. Logs of a job are streamed back to its client, thanks to a
+context variable which is inherited by the threads and tasks running its steps.
+"""
+
+import json
+import logging
+import queue
+import socket
+import socketserver
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from rich.text import Text
+
+from slowhand.client import DEFAULT_SOCKET_PATH
+from slowhand.errors import SlowhandException
+from slowhand.loader import load_job
+from slowhand.logging import get_logger
+from slowhand.runner import JobResult, RunOptions, resume_job, run_job
+
+logger = get_logger(__name__)
+
+# Queue of log messages of the job running in the current context.
+_job_logs: ContextVar[queue.Queue[dict[str, Any]] | None] = ContextVar(
+    "job_logs", default=None
+)
+
+_DONE: dict[str, Any] = {"type": "done"}
+
+
+class _JobLogHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        job_logs = _job_logs.get()
+        if job_logs is None:
+            return
+        try:
+            text = record.getMessage()
+            if getattr(record, "markup", False):
+                text = Text.from_markup(text).plain
+            job_logs.put({"type": "log", "level": record.levelname, "text": text})
+        except Exception:
+            self.handleError(record)
+
+
+def _run_request(request: dict[str, Any], load_lock: threading.Lock) -> JobResult:
+    command = request.get("command")
+    if command not in ("run", "resume"):
+        raise SlowhandException(f"Unknown command: {command}")
+    with load_lock:  # the job catalog is shared by all requests
+        job = load_job(request["job_id"])
+    options = RunOptions(
+        dry_run=bool(request.get("dry_run", False)),
+        max_parallel=int(request.get("max_parallel", 1)),
+        use_async=bool(request.get("use_async", False)),
+    )
+    clean = bool(request.get("clean", True))
+    if command == "run":
+        return run_job(job, request.get("inputs") or {}, options=options, clean=clean)
+    return resume_job(job, run_id=request.get("run_id"), options=options, clean=clean)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "DaemonServer"
+
+    def _send(self, message: dict[str, Any]) -> None:
+        try:
+            self.wfile.write(json.dumps(message).encode() + b"\n")
+            self.wfile.flush()
+        except OSError:
+            pass  # the client is gone: keep running the job anyway
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as exc:
+            self._send({"type": "error", "error": f"Invalid request: {exc}"})
+            return
+        if request.get("command") == "ping":
+            self._send({"type": "result", "succeeded": True})
+            return
+
+        logs: queue.Queue[dict[str, Any]] = queue.Queue()
+        future = self.server.submit(request, logs)
+        future.add_done_callback(lambda _: logs.put(_DONE))
+        while (message := logs.get()) is not _DONE:
+            self._send(message)
+        try:
+            result = future.result()
+        except Exception as exc:
+            self._send({"type": "error", "error": str(exc)})
+        else:
+            self._send({"type": "result"} | asdict(result))
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, *, workers: int) -> None:
+        _remove_stale_socket(socket_path)
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(socket_path), _RequestHandler)
+        self.socket_path = socket_path
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="slowhand-job"
+        )
+        self._load_lock = threading.Lock()
+        self._log_handler = _JobLogHandler()
+        logging.getLogger().addHandler(self._log_handler)
+
+    def submit(
+        self, request: dict[str, Any], logs: queue.Queue[dict[str, Any]]
+    ) -> Future[JobResult]:
+        context = copy_context()
+        context.run(_job_logs.set, logs)
+        return self._executor.submit(
+            context.run, _run_request, request, self._load_lock
+        )
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logging.getLogger().removeHandler(self._log_handler)
+        self.socket_path.unlink(missing_ok=True)
+
+
+def _remove_stale_socket(socket_path: Path) -> None:
+    if not socket_path.exists():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            socket_path.unlink()  # left over by a daemon which was killed
+            return
+    raise SlowhandException(f"A daemon is already running on {socket_path}")
+
+
+def serve(*, socket_path: Path = DEFAULT_SOCKET_PATH, workers: int = 4) -> None:
+    with DaemonServer(socket_path, workers=workers) as server:
+        logger.info("Listening on %s (%d workers)", socket_path, workers)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopping daemon")
@@ -1,10 +1,36 @@
+from collections.abc import Callable
+from functools import lru_cache
+
 from slowhand.context import Context
 from slowhand.expression.lexer import tokenize
-from slowhand.expression.parser import parse_to_ast
+from slowhand.expression.parser import ASTNode, Unknown, parse_to_ast
+
+Condition = Callable[[Context], bool]
+
+
+@lru_cache(maxsize=1024)
+def parse_condition(condition: str) -> ASTNode:
+    return parse_to_ast(tokenize(condition))
+
+
+@lru_cache(maxsize=1024)
+def compile_condition(condition: str) -> Condition:
+    """
+    Compile a condition into a function of the context. Raise `ValueError` if the
+    condition is invalid.
+    """
+    evaluate = parse_condition(condition).compile()
+    return lambda context: bool(evaluate(context))
 
 
 def evaluate_condition(condition: str, *, context: Context) -> bool:
-    tokens = tokenize(condition)
-    ast = parse_to_ast(tokens)
-    result = ast.evaluate(context)
-    return bool(result)
+    return compile_condition(condition)(context)
+
+
+def fold_condition(condition: str, *, context: Context) -> bool | None:
+    """
+    Evaluate a condition with the variables known before running any step (inputs,
+    meta and matrix variables). Return `None` if it depends on outputs.
+    """
+    value = parse_condition(condition).fold(context)
+    return None if isinstance(value, Unknown) else bool(value)
@@ -1,70 +1,102 @@
 import re
-from collections.abc import Callable
+from collections.abc import Iterator
 from dataclasses import dataclass
-from re import Match, Pattern
 from typing import Literal, cast
 
 
-@dataclass
+@dataclass(slots=True)
 class VariableToken:
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class StringToken:
     value: str
 
 
-@dataclass
+@dataclass(slots=True)
+class LiteralToken:
+    value: bool | int
+
+
+@dataclass(slots=True)
 class EqNeqToken:
     op: Literal["==", "!="]
 
 
-@dataclass
+@dataclass(slots=True)
 class AndOrToken:
     op: Literal["&&", "||"]
 
 
-Token = VariableToken | StringToken | EqNeqToken | AndOrToken
-
-TokenFactory = Callable[[Match[str]], Token]
-
-
-_TOKEN_MATCHERS: list[tuple[Pattern, TokenFactory]] = [
-    (
-        re.compile(r"(?P<name>\w+(?:\.\w+)*)"),  # foo.bar
-        lambda m: VariableToken(name=m.group("name")),
-    ),
-    (
-        re.compile(r'"(?P<value>[^"]*)"'),  # "foo bar"
-        lambda m: StringToken(value=m.group("value")),
-    ),
-    (
-        re.compile(r"(?P<op>" + "|".join([re.escape(op) for op in ("==", "!=")]) + ")"),
-        lambda m: EqNeqToken(op=cast(Literal["==", "!="], m.group("op"))),
-    ),
-    (
-        re.compile(r"(?P<op>" + "|".join([re.escape(op) for op in ("&&", "||")]) + ")"),
-        lambda m: AndOrToken(op=cast(Literal["&&", "||"], m.group("op"))),
-    ),
-]
-
-
-def tokenize(expression: str) -> list[Token]:
-    tokens: list[Token] = []
-    expression = expression.strip()
-    pos = 0
-    while pos < len(expression):
-        matched = False
-        for regex, make_token in _TOKEN_MATCHERS:
-            match = regex.match(expression, pos)
-            if match:
-                tokens.append(make_token(match))
-                pos = match.end()
-                while pos < len(expression) and expression[pos].isspace():
-                    pos += 1
-                matched = True
-                break
-        if not matched:
-            raise ValueError(f"Invalid token in: {expression} ({expression[pos:]})")
-    return tokens
+@dataclass(slots=True)
+class NotToken:
+    pass
+
+
+@dataclass(slots=True)
+class ParenToken:
+    paren: Literal["(", ")"]
+
+
+Token = (
+    VariableToken
+    | StringToken
+    | LiteralToken
+    | EqNeqToken
+    | AndOrToken
+    | NotToken
+    | ParenToken
+)
+
+# One alternation of all tokens, tried in order at each position. The `error` group
+# catches any other character, so that every character is matched.
+_TOKEN_REGEX = re.compile(
+    r"""
+    (?P<space>\s+)
+    | (?P<literal>true|false|-?\d+)\b(?!\.)
+    | (?P<variable>\w[\w-]*(?:\.[\w-]+)*)  # foo.bar, steps.my-step.outputs.foo
+    | "(?P<string>[^"]*)"  # "foo bar"
+    | (?P<eq_neq>==|!=)
+    | (?P<and_or>&&|\|\|)
+    | (?P<not>!)
+    | (?P<paren>[()])
+    | (?P<error>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def tokenize(expression: str) -> Iterator[Token]:
+    """
+    Yield the tokens of an expression, in a single pass. Raise `ValueError` (when the
+    token is consumed) with the position of the first invalid character.
+    """
+    for m in _TOKEN_REGEX.finditer(expression):
+        match m.lastgroup:
+            case "space":
+                continue
+            case "literal":
+                value = m.group("literal")
+                if value == "true" or value == "false":
+                    yield LiteralToken(value == "true")
+                else:
+                    yield LiteralToken(int(value))
+            case "variable":
+                yield VariableToken(m.group("variable"))
+            case "string":
+                yield StringToken(m.group("string"))
+            case "eq_neq":
+                yield EqNeqToken(cast(Literal["==", "!="], m.group("eq_neq")))
+            case "and_or":
+                yield AndOrToken(cast(Literal["&&", "||"], m.group("and_or")))
+            case "not":
+                yield NotToken()
+            case "paren":
+                yield ParenToken(cast(Literal["(", ")"], m.group("paren")))
+            case _:
+                pos = m.start()
+                raise ValueError(
+                    f"Invalid token at position {pos} in: {expression} "
+                    f"({expression[pos:]})"
+                )
@@ -1,22 +1,71 @@
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
 from typing import Any, Literal
 
-from slowhand.context import Context
+from slowhand.context import Context, SimpleValue
+from slowhand.errors import SlowhandException
 from slowhand.expression.lexer import (
     AndOrToken,
     EqNeqToken,
+    LiteralToken,
+    NotToken,
+    ParenToken,
     StringToken,
     Token,
     VariableToken,
 )
+from slowhand.template import parse_variable
+
+Evaluator = Callable[[Context], SimpleValue]
+
+
+class Unknown:
+    """
+    Value of an expression which depends on outputs, which are only known at runtime.
+    """
+
+    def __repr__(self) -> str:
+        return "UNKNOWN"
+
+
+UNKNOWN = Unknown()
+
+# Variables known before running any step.
+_STATIC_VAR_PREFIXES = ("inputs.", "meta.", "matrix.")
+
+
+def _to_str(value: SimpleValue) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value) if value is not None else ""
+
+
+def _equals(left: SimpleValue, right: SimpleValue) -> bool:
+    # Values of different types (e.g. a step output and an int literal) are compared
+    # as strings.
+    if type(left) is type(right):
+        return left == right
+    return _to_str(left) == _to_str(right)
 
 
 @dataclass
 class VariableNode:
     name: str
 
-    def evaluate(self, context: Context) -> str:
-        return context.resolve_variable(self.name)
+    def evaluate(self, context: Context) -> SimpleValue:
+        return context.lookup_variable(parse_variable(self.name))
+
+    def compile(self) -> Evaluator:
+        try:
+            ref = parse_variable(self.name)
+        except SlowhandException as exc:
+            raise ValueError(str(exc))
+        return lambda context: context.lookup_variable(ref)
+
+    def fold(self, context: Context) -> SimpleValue | Unknown:
+        if not self.name.startswith(_STATIC_VAR_PREFIXES):
+            return UNKNOWN
+        return self.evaluate(context)
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -32,6 +81,34 @@ class StringNode:
     def evaluate(self, context: Context) -> str:
         return self.value
 
+    def compile(self) -> Evaluator:
+        value = self.value
+        return lambda context: value
+
+    def fold(self, context: Context) -> SimpleValue | Unknown:
+        return self.value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "type": type(self).__name__,
+            "value": self.value,
+        }
+
+
+@dataclass
+class LiteralNode:
+    value: bool | int
+
+    def evaluate(self, context: Context) -> bool | int:
+        return self.value
+
+    def compile(self) -> Evaluator:
+        value = self.value
+        return lambda context: value
+
+    def fold(self, context: Context) -> SimpleValue | Unknown:
+        return self.value
+
     def to_dict(self) -> dict[str, Any]:
         return {
             "type": type(self).__name__,
@@ -39,6 +116,28 @@ class StringNode:
         }
 
 
+@dataclass
+class NotNode:
+    operand: "ASTNode"
+
+    def evaluate(self, context: Context) -> bool:
+        return not self.operand.evaluate(context)
+
+    def compile(self) -> Evaluator:
+        operand = self.operand.compile()
+        return lambda context: not operand(context)
+
+    def fold(self, context: Context) -> bool | Unknown:
+        operand = self.operand.fold(context)
+        return UNKNOWN if isinstance(operand, Unknown) else not operand
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "type": type(self).__name__,
+            "operand": self.operand.to_dict(),
+        }
+
+
 @dataclass
 class EqNeqNode:
     left: "ASTNode"
@@ -46,12 +145,23 @@ class EqNeqNode:
     right: "ASTNode"
 
     def evaluate(self, context: Context) -> bool:
-        left = self.left.evaluate(context)
-        right = self.right.evaluate(context)
+        equals = _equals(self.left.evaluate(context), self.right.evaluate(context))
+        return equals if self.op == "==" else not equals
+
+    def compile(self) -> Evaluator:
+        left = self.left.compile()
+        right = self.right.compile()
         if self.op == "==":
-            return left == right
-        else:
-            return left != right
+            return lambda context: _equals(left(context), right(context))
+        return lambda context: not _equals(left(context), right(context))
+
+    def fold(self, context: Context) -> bool | Unknown:
+        left = self.left.fold(context)
+        right = self.right.fold(context)
+        if isinstance(left, Unknown) or isinstance(right, Unknown):
+            return UNKNOWN
+        equals = _equals(left, right)
+        return equals if self.op == "==" else not equals
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -69,12 +179,38 @@ class AndOrNode:
     right: "ASTNode"
 
     def evaluate(self, context: Context) -> bool:
-        left = self.left.evaluate(context)
-        right = self.right.evaluate(context)
+        # The right operand is only evaluated if needed.
+        left = bool(self.left.evaluate(context))
         if self.op == "&&":
-            return bool(left and right)
+            return left and bool(self.right.evaluate(context))
         else:
-            return bool(left or right)
+            return left or bool(self.right.evaluate(context))
+
+    def compile(self) -> Evaluator:
+        left = self.left.compile()
+        right = self.right.compile()
+        if self.op == "&&":
+            return lambda context: bool(left(context)) and bool(right(context))
+        return lambda context: bool(left(context)) or bool(right(context))
+
+    def fold(self, context: Context) -> bool | Unknown:
+        # A known operand decides the result if it's falsy for `&&` or truthy for `||`.
+        # As at runtime, the right operand is only folded if the left one doesn't.
+        decisive = self.op == "||"
+        left = self.left.fold(context)
+        if not isinstance(left, Unknown):
+            if bool(left) == decisive:
+                return decisive
+            right = self.right.fold(context)
+            return right if isinstance(right, Unknown) else bool(right)
+        try:
+            right = self.right.fold(context)
+        except SlowhandException:
+            # It may not be evaluated at runtime, depending on the left operand.
+            return UNKNOWN
+        if not isinstance(right, Unknown) and bool(right) == decisive:
+            return decisive
+        return UNKNOWN
 
     def to_dict(self) -> dict[str, Any]:
         return {
@@ -85,23 +221,27 @@ class AndOrNode:
         }
 
 
-ASTNode = VariableNode | StringNode | EqNeqNode | AndOrNode
+ASTNode = VariableNode | StringNode | LiteralNode | NotNode | EqNeqNode | AndOrNode
 
 
 class TokenList:
-    def __init__(self, tokens: list[Token]) -> None:
-        self._tokens = tokens
+    """
+    Consume tokens (lazily produced by the lexer) with a lookahead of one token.
+    """
+
+    def __init__(self, tokens: Iterable[Token]) -> None:
+        self._tokens = iter(tokens)
+        self._next: Token | None = next(self._tokens, None)
         self._index = 0
 
     def peek(self) -> Token | None:
-        if self._index < len(self._tokens):
-            return self._tokens[self._index]
-        return None
+        return self._next
 
     def consume(self) -> Token:
-        if self._index >= len(self._tokens):
+        token = self._next
+        if token is None:
             raise ValueError(f"No token to consume at index {self._index}")
-        token = self._tokens[self._index]
+        self._next = next(self._tokens, None)
         self._index += 1
         return token
 
@@ -113,15 +253,30 @@ def _parse_atom(tokens: TokenList) -> ASTNode:
             return VariableNode(name)
         case StringToken(value):
             return StringNode(value)
+        case LiteralToken(value):
+            return LiteralNode(value)
+        case ParenToken("("):
+            node = _parse_or(tokens)
+            if tokens.peek() != ParenToken(")"):
+                raise ValueError(f"Expected `)` but got: {tokens.peek()}")
+            tokens.consume()
+            return node
         case _:
             raise ValueError(f"Unexpected token: {token}")
 
 
+def _parse_not(tokens: TokenList) -> ASTNode:
+    if isinstance(tokens.peek(), NotToken):
+        tokens.consume()
+        return NotNode(operand=_parse_not(tokens))
+    return _parse_atom(tokens)
+
+
 def _parse_eq_neq(tokens: TokenList) -> ASTNode:
-    node = _parse_atom(tokens)
+    node = _parse_not(tokens)
     if (token := tokens.peek()) and isinstance(token, EqNeqToken):
         tokens.consume()  # pop out the peeked operator
-        right = _parse_atom(tokens)
+        right = _parse_not(tokens)
         node = EqNeqNode(left=node, op=token.op, right=right)
     return node
 
@@ -148,7 +303,13 @@ def _parse_or(tokens: TokenList) -> ASTNode:
     return node
 
 
-def parse_to_ast(tokens: list[Token]) -> ASTNode:
-    # TODO: Use the shunting yard algorithm.
-    # See: https://en.wikipedia.org/wiki/Shunting_yard_algorithm
-    return _parse_or(TokenList(tokens))
+def parse_to_ast(tokens: Iterable[Token]) -> ASTNode:
+    """
+    Parse tokens with a recursive descent parser. From the lowest to the highest
+    precedence: `||`, `&&`, `==` / `!=`, `!`, then atoms and parentheses.
+    """
+    token_list = TokenList(tokens)
+    node = _parse_or(token_list)
+    if (token := token_list.peek()) is not None:
+        raise ValueError(f"Unexpected token: {token}")
+    return node
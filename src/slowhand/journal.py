@@ -0,0 +1,99 @@
+"""
+Append-only JSONL journal, used to persist the context state of a run after every
+change, at a cost proportional to the change rather than to the whole state.
+
+Every record is flushed to the OS as soon as it is appended, so that it survives a
+crash or a kill of the process. Syncing to disk (`fsync`) is batched: at most every
+`sync_every` records or `sync_interval` seconds, and when the journal is closed.
+"""
+
+import json
+import os
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+from slowhand.logging import get_logger
+
+logger = get_logger(__name__)
+
+Record = dict[str, Any]
+
+
+def read_journal(journal_file: Path) -> Iterator[Record]:
+    """
+    Read the records of a journal. A torn last line (the process was killed in the
+    middle of a write) is ignored.
+    """
+    with journal_file.open("r") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                logger.warning("Ignoring incomplete record in %s", journal_file)
+                break
+            yield json.loads(line)
+
+
+class Journal:
+    def __init__(
+        self,
+        journal_file: Path,
+        *,
+        sync_every: int = 16,
+        sync_interval: float = 1.0,
+    ) -> None:
+        self.journal_file = journal_file
+        self._sync_every = sync_every
+        self._sync_interval = sync_interval
+        self._file: TextIO | None = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def rewrite(self, records: Iterable[Record]) -> None:
+        """
+        Atomically replace the content of the journal (e.g. to compact it), and keep
+        appending to the new file.
+        """
+        self.close()
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.journal_file.with_name(f"{self.journal_file.name}.tmp")
+        with tmp_file.open("w") as f:
+            for record in records:
+                f.write(_dump_record(record))
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_file.replace(self.journal_file)
+        self._file = self.journal_file.open("a")
+
+    def append(self, record: Record) -> None:
+        if self._file is None:
+            self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.journal_file.open("a")
+        self._file.write(_dump_record(record))
+        self._file.flush()
+        self._unsynced += 1
+        if (
+            self._unsynced >= self._sync_every
+            or time.monotonic() - self._last_sync >= self._sync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def delete(self) -> None:
+        self.close()
+        self.journal_file.unlink(missing_ok=True)
+
+
+def _dump_record(record: Record) -> str:
+    return json.dumps(record, separators=(",", ":")) + "\n"
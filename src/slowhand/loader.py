@@ -1,15 +1,33 @@
+import re
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from importlib.resources import files
 from importlib.resources.abc import Traversable
 from pathlib import Path
+from typing import Any
 
 import yaml
 
-from slowhand.config import settings
+from slowhand.catalog import get_catalog
+from slowhand.config import get_settings
 from slowhand.errors import SlowhandException
 from slowhand.models import Job
 
 PACKAGE_NAME = "slowhand"
 
+# Jobs dirs may be on a network filesystem: scan them and read job files in parallel.
+_DISCOVERY_WORKERS = 16
+
+_NAME_LINE_REGEX = re.compile(r"^name:.*$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class JobHeader:
+    job_id: str
+    name: str
+    source: str
+
 
 class JobSource:
     def __init__(self, file: Path | Traversable) -> None:
@@ -25,8 +43,25 @@ class JobSource:
         return name
 
     def create_job(self) -> Job:
-        with self._file.open("r") as f:
-            data = yaml.safe_load(f)
+        if isinstance(self._file, Path):
+            return get_catalog().load_job(self._file, self._parse_job)
+        return self._parse_job(self._file.read_bytes())
+
+    def read_header(self) -> JobHeader:
+        """
+        Read the job ID and name, without parsing nor validating the whole job.
+        """
+        content = self._file.read_text()
+        name: Any = None
+        if m := _NAME_LINE_REGEX.search(content):
+            name = (yaml.safe_load(m.group(0)) or {}).get("name")
+        if not name or not isinstance(name, str):
+            # e.g. a multi-line name.
+            name = (yaml.safe_load(content) or {}).get("name")
+        return JobHeader(job_id=self.job_id, name=str(name), source=str(self._file))
+
+    def _parse_job(self, content: bytes) -> Job:
+        data = yaml.safe_load(content)
         return Job(
             job_id=self.job_id,
             source=str(self._file),
@@ -35,7 +70,7 @@ class JobSource:
 
 
 def find_job_source(job_id: str) -> JobSource:
-    for jobs_dir in settings.jobs_dirs:
+    for jobs_dir in get_settings().jobs_dirs:
         user_job_file = jobs_dir / f"{job_id}.yaml"
         if user_job_file.is_file():
             return JobSource(user_job_file)
@@ -48,25 +83,54 @@ def find_job_source(job_id: str) -> JobSource:
 
 
 def load_job(job_id: str) -> Job:
-    return find_job_source(job_id).create_job()
+    job = find_job_source(job_id).create_job()
+    get_catalog().save()
+    return job
+
+
+def _list_job_files(jobs_dir: Path) -> list[Path]:
+    if not jobs_dir.is_dir():
+        return []
+    return [f for f in jobs_dir.glob("*.yaml") if f.is_file()]
+
+
+def load_user_jobs() -> Iterator[JobHeader]:
+    """
+    Yield headers of user jobs, as soon as they are read.
+    """
+    with ThreadPoolExecutor(max_workers=_DISCOVERY_WORKERS) as executor:
+        scans: set[Future[Any]] = {
+            executor.submit(_list_job_files, jobs_dir)
+            for jobs_dir in get_settings().jobs_dirs
+        }
+        reads: set[Future[Any]] = set()
+        while scans or reads:
+            done, _ = wait(scans | reads, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in scans:
+                    scans.remove(future)
+                    reads.update(
+                        executor.submit(JobSource(job_file).read_header)
+                        for job_file in future.result()
+                    )
+                else:
+                    reads.remove(future)
+                    yield future.result()
+
+
+def _iter_builtin_job_sources() -> Iterator[JobSource]:
+    jobs_dir = files(PACKAGE_NAME).joinpath("jobs")
+    if jobs_dir.is_dir():
+        for job_file in jobs_dir.iterdir():
+            if job_file.is_file() and job_file.name.endswith(".yaml"):
+                yield JobSource(job_file)
 
 
-def load_user_jobs() -> list[Job]:
-    jobs: list[Job] = []
-    for jobs_dir in settings.jobs_dirs:
-        if not jobs_dir.is_dir():
-            continue
-        for job_file in jobs_dir.glob("*.yaml"):
-            if job_file.is_file():
-                jobs.append(JobSource(job_file).create_job())
-    return jobs
+def load_builtin_job_headers() -> list[JobHeader]:
+    return [source.read_header() for source in _iter_builtin_job_sources()]
 
 
 def load_builtin_jobs() -> list[Job]:
-    jobs: list[Job] = []
-    jobs_dir = files(PACKAGE_NAME).joinpath("jobs")
-    if jobs_dir.is_dir():
-        for job_file in jobs_dir.iterdir():
-            if job_file.is_file() and job_file.name.endswith(".yaml"):
-                jobs.append(JobSource(job_file).create_job())
+    jobs = [source.create_job() for source in _iter_builtin_job_sources()]
+    get_catalog().save()
     return jobs
@@ -1,12 +1,12 @@
 import datetime
 import json
 import logging
-from collections.abc import Iterable, Mapping
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Any
 
-from rich.logging import RichHandler
-
-from slowhand.config import settings
+from rich.markup import escape
 
 
 def _apply_style(text: Any, style: str) -> str:
@@ -74,10 +74,24 @@ def _safe_json_dump(value: Any) -> str:
         return f"Fail to dump JSON: {exc}"
 
 
+# Prefix of log messages, to tell apart logs of steps running concurrently.
+_log_prefix: ContextVar[str] = ContextVar("log_prefix", default="")
+
+
+@contextmanager
+def log_prefix(prefix: str) -> Iterator[None]:
+    token = _log_prefix.set(_log_prefix.get() + muted(escape(f"[{prefix}]")) + " ")
+    try:
+        yield
+    finally:
+        _log_prefix.reset(token)
+
+
 def _format(msg: str, kwargs: dict[str, Any]) -> tuple[str, dict[str, Any]]:
     extra = (kwargs.get("extra") or {}).copy()  # don't mutate the original `extra`
     if extra:
         msg = f"{msg}\n{_safe_json_dump(extra)}"
+    msg = _log_prefix.get() + msg
     extra["markup"] = True
     kwargs = kwargs | {"extra": extra}
     return msg, kwargs
@@ -105,8 +119,13 @@ class ConsoleLogger:
 
 
 def configure_logging() -> None:
+    # Imported here, so that importing this module stays cheap.
+    from rich.logging import RichHandler
+
+    from slowhand.config import get_settings
+
     logging.basicConfig(
-        level="DEBUG" if settings.debug else "INFO",
+        level="DEBUG" if get_settings().debug else "INFO",
         format="%(message)s",
         datefmt="%H:%M:%S",
         handlers=[RichHandler(rich_tracebacks=True)],
@@ -1,27 +1,79 @@
+from collections.abc import Iterable
+from pathlib import Path
 from textwrap import indent
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 
 import typer
-import yaml
 from rich import print as rprint
 
-from slowhand.config import settings
-from slowhand.loader import load_builtin_jobs, load_job, load_user_jobs
-from slowhand.logging import configure_logging, muted, primary, secondary
-from slowhand.models import Job
-from slowhand.runner import resume_job, run_job
-from slowhand.tools import get_gh_info, get_git_info
+from slowhand.completion import complete_inputs, complete_job_ids
+from slowhand.errors import SlowhandException
+from slowhand.logging import (
+    alert,
+    configure_logging,
+    danger,
+    muted,
+    primary,
+    secondary,
+    success,
+)
 from slowhand.version import VERSION
 
-configure_logging()
+if TYPE_CHECKING:
+    from slowhand.loader import JobHeader
+    from slowhand.planner import StepPlan
+
+# Modules of commands are imported by the commands themselves, so that the CLI starts
+# fast: e.g. `slowhand version` does not need `pydantic`.
 
 app = typer.Typer(no_args_is_help=True)
 
 
+def _complete_inputs(ctx: typer.Context, incomplete: str) -> list[str]:
+    job_id = ctx.params.get("job_id")
+    return complete_inputs(job_id, incomplete) if job_id else []
+
+
+JobIdArgument = Annotated[str, typer.Argument(autocompletion=complete_job_ids)]
+
+TraceOption = Annotated[
+    Path | None,
+    typer.Option(help="Save a trace of the run (Chrome trace format) to this file"),
+]
+
+ProfileOption = Annotated[
+    bool,
+    typer.Option(help="Profile steps, and save their profiles in the run dir"),
+]
+
+ProfileSamplingOption = Annotated[
+    float | None,
+    typer.Option(
+        min=1,
+        help=(
+            "Profile steps by sampling their stack every N ms (implies --profile). "
+            "With --async, samples of steps running at the same time are mixed"
+        ),
+    ),
+]
+
+InputsOption = Annotated[
+    list[str] | None,
+    typer.Option(
+        "-I",
+        "--input",
+        help="Job inputs in <key>=<value> format",
+        autocompletion=_complete_inputs,
+    ),
+]
+
+
 @app.command()
 def config():
     """Print config"""
-    print(settings.model_dump_json(indent=2))
+    from slowhand.config import get_settings
+
+    print(get_settings().model_dump_json(indent=2))
 
 
 @app.command()
@@ -34,6 +86,7 @@ def version():
 @app.command()
 def info():
     """Print version and tools info"""
+    from slowhand.tools import get_gh_info, get_git_info
 
     def print_info(title: str, content: str) -> None:
         rprint(f"[bold green]{title}[/bold green]")
@@ -45,24 +98,48 @@ def info():
     print_info("gh", get_gh_info())
 
 
+@app.command()
+def gc(
+    max_age_days: Annotated[
+        int, typer.Option(min=0, help="Delete git mirrors unused for that long")
+    ] = 30,
+):
+    """Delete stale git mirrors and evict the step cache"""
+    from slowhand.cache import evict_cache
+    from slowhand.mirrors import gc_mirrors
+
+    deleted_mirrors = gc_mirrors(max_age_days)
+    rprint(f"Deleted {len(deleted_mirrors)} git mirror(s)")
+    for mirror_dir in deleted_mirrors:
+        rprint(muted(f"  - {mirror_dir}"))
+    rprint(f"Evicted {evict_cache()} cache entries")
+
+
 @app.command()
 def jobs():
     """List available jobs"""
-    user_jobs = load_user_jobs()
-    builtin_jobs = load_builtin_jobs()
+    from slowhand.loader import load_builtin_job_headers, load_user_jobs
 
-    def print_jobs(kind: str, jobs: list[Job]):
-        rprint(primary(f"{kind} jobs") + muted(f" (x{len(jobs)})"))
+    def print_jobs(kind: str, jobs: Iterable["JobHeader"]):
+        rprint(primary(f"{kind} jobs"))
+        count = 0
         for job in jobs:
             rprint(f"  - {secondary(job.job_id)} : {job.name} {muted(job.source)}")
+            count += 1
+        rprint(muted(f"  (x{count})"))
 
-    print_jobs("user", user_jobs)
-    print_jobs("builtin", builtin_jobs)
+    # User jobs are printed as they are found.
+    print_jobs("user", load_user_jobs())
+    print_jobs("builtin", load_builtin_job_headers())
 
 
 @app.command()
-def show(job_id: str, brief: bool = False):
+def show(job_id: JobIdArgument, brief: bool = False):
     """Show detail of a job"""
+    import yaml
+
+    from slowhand.loader import load_job
+
     job = load_job(job_id)
     if brief:
         rprint(f"{primary(job.job_id)} : {job.name}")
@@ -84,41 +161,234 @@ def show(job_id: str, brief: bool = False):
         print(yaml.dump(job_data))
 
 
+@app.command()
+def plan(
+    job_id: JobIdArgument,
+    input_args: InputsOption = None,
+):
+    """Show which steps of a job will run, without running anything"""
+    from slowhand.context import Context
+    from slowhand.loader import load_job
+    from slowhand.planner import plan_steps
+    from slowhand.utils import parse_key_values
+
+    try:
+        inputs = parse_key_values(input_args or [])
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc))
+
+    job = load_job(job_id)
+    job_inputs = job.parse_inputs(inputs)
+    context = Context(job.job_id)
+    try:
+        context.save_inputs(job_inputs)
+        plans = plan_steps(job.steps, context)
+    finally:
+        context.teardown()
+
+    markers = {
+        "run": success("●"),
+        "skip": muted("○"),
+        "runtime": alert("?"),
+    }
+    counts = {"run": 0, "skip": 0, "runtime": 0}
+
+    def print_plans(plans: list["StepPlan"], depth: int):
+        for plan in plans:
+            counts[plan.status] += 1
+            rprint(
+                f"{'  ' * depth}{markers[plan.status]} {plan.name} "
+                + muted(f"({plan.step_id})")
+            )
+            print_plans(plan.children, depth + 1)
+
+    rprint(f"{primary(job.name)} {muted(job.source)}")
+    print_plans(plans, 1)
+    print()
+    rprint(
+        f"{markers['run']} {counts['run']} will run, "
+        f"{markers['skip']} {counts['skip']} skipped, "
+        f"{markers['runtime']} {counts['runtime']} depending on step outputs"
+    )
+
+
 @app.command()
 def run(
-    job_id: str,
-    input_args: Annotated[
-        list[str] | None,
-        typer.Option("-I", "--input", help="Job inputs in <key>=<value> format"),
-    ] = None,
+    job_id: JobIdArgument,
+    input_args: InputsOption = None,
     dry_run: bool = False,
     clean: bool = True,
+    max_parallel: Annotated[
+        int,
+        typer.Option(min=1, help="Max number of independent steps run in parallel"),
+    ] = 1,
+    use_async: Annotated[
+        bool,
+        typer.Option("--async", help="Run steps on an asyncio event loop"),
+    ] = False,
+    trace: TraceOption = None,
+    profile: ProfileOption = False,
+    profile_sampling: ProfileSamplingOption = None,
 ):
     """Load and run a job"""
+    from slowhand.loader import load_job
+    from slowhand.runner import RunOptions, run_job
+    from slowhand.tracing import tracing
+    from slowhand.utils import parse_key_values
+
     # Parse job inputs.
-    inputs = {}
-    for input_arg in input_args or []:
-        tokens = input_arg.split("=", 1)
-        if len(tokens) != 2:
-            raise typer.BadParameter(
-                f"Input must be in format <key>=<value>: {input_arg}"
-            )
-        key = tokens[0]
-        value = tokens[1]
-        inputs[key] = value
+    try:
+        inputs = parse_key_values(input_args or [])
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc))
 
     job = load_job(job_id)
-    run_job(job, inputs=inputs, dry_run=dry_run, clean=clean)
+    options = RunOptions(
+        dry_run=dry_run,
+        max_parallel=max_parallel,
+        use_async=use_async,
+        profile=profile or profile_sampling is not None,
+        profile_interval=profile_sampling / 1000 if profile_sampling else None,
+    )
+    with tracing(trace):
+        run_job(job, inputs=inputs, options=options, clean=clean)
+    if trace:
+        rprint(f"Saved trace at: {alert(trace)}")
 
 
 @app.command()
-def resume(job_id: str, dry_run: bool = False, clean: bool = True):
+def resume(
+    job_id: JobIdArgument,
+    run_id: Annotated[
+        str | None,
+        typer.Option(
+            help="Run to resume, defaults to the latest failed run of the job"
+        ),
+    ] = None,
+    dry_run: bool = False,
+    clean: bool = True,
+    max_parallel: Annotated[
+        int,
+        typer.Option(min=1, help="Max number of independent steps run in parallel"),
+    ] = 1,
+    use_async: Annotated[
+        bool,
+        typer.Option("--async", help="Run steps on an asyncio event loop"),
+    ] = False,
+    trace: TraceOption = None,
+    profile: ProfileOption = False,
+    profile_sampling: ProfileSamplingOption = None,
+):
     """Resume a previously failed job from its checkpoint"""
+    from slowhand.loader import load_job
+    from slowhand.runner import RunOptions, resume_job
+    from slowhand.tracing import tracing
+
     job = load_job(job_id)
-    resume_job(job, dry_run=dry_run, clean=clean)
+    options = RunOptions(
+        dry_run=dry_run,
+        max_parallel=max_parallel,
+        use_async=use_async,
+        profile=profile or profile_sampling is not None,
+        profile_interval=profile_sampling / 1000 if profile_sampling else None,
+    )
+    with tracing(trace):
+        resume_job(job, run_id=run_id, options=options, clean=clean)
+    if trace:
+        rprint(f"Saved trace at: {alert(trace)}")
+
+
+@app.command("run-many")
+def run_many(
+    run_specs: Annotated[
+        list[str] | None,
+        typer.Option(
+            "-r", "--run", help='Job to run in "<job_id> <key>=<value> ..." format'
+        ),
+    ] = None,
+    file: Annotated[
+        Path | None,
+        typer.Option("-f", "--file", help="JSONL or CSV file of jobs to run"),
+    ] = None,
+    concurrency: Annotated[
+        int, typer.Option("-j", "--concurrency", min=1, help="Max jobs run at once")
+    ] = 4,
+    dry_run: bool = False,
+    clean: bool = True,
+    max_parallel: Annotated[
+        int,
+        typer.Option(min=1, help="Max number of independent steps run in parallel"),
+    ] = 1,
+    use_async: Annotated[
+        bool,
+        typer.Option("--async", help="Run steps on an asyncio event loop"),
+    ] = False,
+):
+    """Run many jobs (or a job with many input sets) concurrently"""
+    from rich.table import Table
+
+    from slowhand.batch import (
+        load_batch_file,
+        parse_batch_run,
+        run_batch,
+        validate_batch_runs,
+    )
+    from slowhand.runner import RunOptions
+
+    try:
+        runs = [parse_batch_run(spec) for spec in run_specs or []]
+        if file:
+            runs.extend(load_batch_file(file))
+        validate_batch_runs(runs)
+    except SlowhandException as exc:
+        raise typer.BadParameter(str(exc))
+    if not runs:
+        raise typer.BadParameter("No job to run: use --run or --file")
+
+    options = RunOptions(
+        dry_run=dry_run, max_parallel=max_parallel, use_async=use_async
+    )
+    results = run_batch(runs, concurrency=concurrency, options=options, clean=clean)
+
+    table = Table(title="Summary")
+    table.add_column("Run")
+    table.add_column("Status")
+    table.add_column("Duration", justify="right")
+    table.add_column("Outputs")
+    for run, result in zip(runs, results):
+        status = success("ok") if result.succeeded else danger("failed")
+        outputs = "\n".join(f"{name}={value}" for name, value in result.outputs.items())
+        table.add_row(
+            run.label,
+            status,
+            f"{result.duration:.1f}s",
+            outputs or muted(result.error or ""),
+        )
+    rprint(table)
+
+    if not all(result.succeeded for result in results):
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    socket_path: Annotated[
+        Path | None,
+        typer.Option("--socket", help="Unix socket to listen on"),
+    ] = None,
+    workers: Annotated[
+        int, typer.Option(min=1, help="Max jobs run at once by the daemon")
+    ] = 4,
+):
+    """Run a daemon running jobs for `slowhand-client`, with warm caches"""
+    from slowhand.client import DEFAULT_SOCKET_PATH
+    from slowhand.daemon import serve
+
+    serve(socket_path=socket_path or DEFAULT_SOCKET_PATH, workers=workers)
 
 
 def main():
+    configure_logging()
     app()
 
 
@@ -0,0 +1,78 @@
+"""
+Resource usage of steps: wall time, and CPU time, max RSS and block I/O of their
+subprocesses, from `getrusage(RUSAGE_CHILDREN)` deltas.
+
+Usage of children is process-wide: steps running concurrently are attributed the
+usage of each other's subprocesses. The max RSS of children is a high-water mark, so it
+is only known for the steps raising it; as children are forked from slowhand, it is at
+least the RSS of slowhand itself.
+
+Only children which exited and were reaped are counted. With `shell: persistent`, the
+bash sessions outlive the steps, so the CPU time, RSS and I/O of shell steps are not
+attributed to them (commands run by the session are only reaped by bash itself); their
+wall time is still accurate.
+"""
+
+import resource
+import sys
+import time
+from collections.abc import Mapping
+
+from slowhand.context import SimpleValue
+
+# `ru_maxrss` is in bytes on macOS, in kilobytes elsewhere.
+_MAX_RSS_DIVISOR = 1024 if sys.platform == "darwin" else 1
+
+_COLUMNS = (
+    # (header, metric name, format)
+    ("WALL", "wall_ms", lambda ms: f"{ms / 1000:.2f}s"),
+    ("USER", "user_cpu_ms", lambda ms: f"{ms / 1000:.2f}s"),
+    ("SYS", "sys_cpu_ms", lambda ms: f"{ms / 1000:.2f}s"),
+    ("MAX RSS", "max_rss_kb", lambda kb: f"{kb / 1024:.1f}M"),
+    ("BLK IN", "read_blocks", str),
+    ("BLK OUT", "write_blocks", str),
+)
+
+
+class UsageMeter:
+    """
+    Measure resource usage from its creation.
+    """
+
+    def __init__(self) -> None:
+        self._start = time.perf_counter()
+        self._usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    def read(self) -> dict[str, SimpleValue]:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        metrics: dict[str, SimpleValue] = {
+            "wall_ms": round((time.perf_counter() - self._start) * 1000),
+            "user_cpu_ms": round((usage.ru_utime - self._usage.ru_utime) * 1000),
+            "sys_cpu_ms": round((usage.ru_stime - self._usage.ru_stime) * 1000),
+            "read_blocks": usage.ru_inblock - self._usage.ru_inblock,
+            "write_blocks": usage.ru_oublock - self._usage.ru_oublock,
+        }
+        if usage.ru_maxrss > self._usage.ru_maxrss:
+            metrics["max_rss_kb"] = usage.ru_maxrss // _MAX_RSS_DIVISOR
+        return metrics
+
+
+def format_metrics_table(metrics: Mapping[str, Mapping[str, SimpleValue]]) -> str:
+    """
+    Format metrics of steps (by step ID) as a plain text table.
+    """
+    rows = [["STEP", *(header for header, _, _ in _COLUMNS)]]
+    for step_id, step_metrics in metrics.items():
+        row = [step_id]
+        for _, name, format in _COLUMNS:
+            value = step_metrics.get(name)
+            row.append("-" if value is None else format(value))
+        rows.append(row)
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    )
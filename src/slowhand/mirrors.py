@@ -0,0 +1,92 @@
+"""
+Local bare mirrors of git repos, stored in `~/.slowhand/mirrors/<owner>/<repo>.git`.
+
+A mirror is updated with an incremental `git fetch` before each clone, then used as a
+reference so that only missing objects are downloaded. Mirrors are protected by a lock
+file (`<repo>.git.lock`) so that concurrent runs can share them: updates and GC take
+an exclusive lock, clones take a shared one. The lock file mtime records last usage.
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+
+from slowhand.config import ensure_app_user_dir
+from slowhand.logging import get_logger
+from slowhand.utils import file_lock, random_name, run_command
+
+logger = get_logger(__name__)
+
+
+def _get_mirrors_dir() -> Path:
+    return ensure_app_user_dir() / "mirrors"
+
+
+def get_mirror_dir(repo: str) -> Path:
+    return _get_mirrors_dir() / f"{repo}.git"
+
+
+def _get_lock_file(mirror_dir: Path) -> Path:
+    return mirror_dir.with_name(f"{mirror_dir.name}.lock")
+
+
+def update_mirror(url: str, mirror_dir: Path) -> None:
+    lock_file = _get_lock_file(mirror_dir)
+    with file_lock(lock_file):
+        if (mirror_dir / "HEAD").is_file():
+            logger.info("Updating mirror: %s", mirror_dir)
+            run_command(
+                "git", "fetch", "--prune", "origin", cwd=mirror_dir, stream=True
+            )
+        else:
+            logger.info("Creating mirror: %s", mirror_dir)
+            # Clone in a temp dir first, not to leave a broken mirror on failure.
+            tmp_dir = mirror_dir.with_name(random_name(mirror_dir.name))
+            try:
+                run_command("git", "clone", "--mirror", url, str(tmp_dir), stream=True)
+                tmp_dir.rename(mirror_dir)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.utime(lock_file)
+
+
+def clone_with_mirror(
+    url: str, mirror_dir: Path, repo_dir: str, clone_opts: list[str]
+) -> None:
+    update_mirror(url, mirror_dir)
+    with file_lock(_get_lock_file(mirror_dir), shared=True):
+        run_command(
+            "git",
+            "clone",
+            "--reference",
+            str(mirror_dir),
+            "--dissociate",  # don't depend on the mirror once cloned
+            *clone_opts,
+            url,
+            repo_dir,
+            stream=True,
+        )
+
+
+def gc_mirrors(max_age_days: int) -> list[Path]:
+    """
+    Delete mirrors not used for `max_age_days`, unless they are in use.
+    """
+    deleted: list[Path] = []
+    now = time.time()
+    for lock_file in _get_mirrors_dir().glob("*/*.git.lock"):
+        mirror_dir = lock_file.with_suffix("")
+        if not mirror_dir.is_dir():
+            continue
+        if now - lock_file.stat().st_mtime < max_age_days * 86400:
+            continue
+        try:
+            with file_lock(lock_file, blocking=False):
+                logger.info("Deleting stale mirror: %s", mirror_dir)
+                shutil.rmtree(mirror_dir, ignore_errors=True)
+        except BlockingIOError:
+            continue  # in use
+        # Keep the lock file: other processes may be waiting for it.
+        deleted.append(mirror_dir)
+    return deleted
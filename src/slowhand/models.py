@@ -1,11 +1,21 @@
 import hashlib
+import itertools
 import re
 import unicodedata
-from typing import Literal, cast
+from typing import Any, Literal, Self, cast
 
-from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from pydantic import (
+    BaseModel,
+    Field,
+    PrivateAttr,
+    ValidationInfo,
+    field_validator,
+    model_validator,
+)
 
 from slowhand.errors import SlowhandException
+from slowhand.expression import compile_condition
+from slowhand.template import compile_templates
 
 InputValue = str | bool | int
 
@@ -38,6 +48,17 @@ def _slugify(text: str) -> str:
     return value.strip("-_")
 
 
+def _compile_templates(value: Any) -> Any:
+    try:
+        return compile_templates(value)
+    except SlowhandException as exc:
+        raise ValueError(str(exc))
+
+
+def _matrix_key(values: dict[str, "InputValue"]) -> str:
+    return "-".join(re.sub(r"[^\w-]", "_", str(value)) for value in values.values())
+
+
 class JobInput(BaseModel):
     description: str | None = None
     type: Literal["string", "bool", "int"]
@@ -91,6 +112,58 @@ class BaseJobStep(BaseModel):
     provided_id: str | None = Field(None, alias="id")
     name: str
     condition: str | None = Field(None, alias="if")
+    # Run one instance of the step per combination of values, e.g.
+    # `{env: [next, load]}`. Instance outputs are saved in `steps.<id>.<key>.outputs`.
+    matrix: dict[str, list[InputValue]] | None = None
+    # Max number of child steps (of a group) or matrix instances running at the same
+    # time.
+    max_concurrency: int | None = Field(None, alias="max-concurrency", gt=0)
+    # Opt-in: restore outputs of a previous run of the same action with the same
+    # resolved params, `cache-key` and content of `cache-files` (glob patterns).
+    cache: bool = False
+    cache_key: str | None = Field(None, alias="cache-key")
+    cache_files: list[str] = Field(default_factory=list, alias="cache-files")
+
+    @field_validator("condition")
+    @classmethod
+    def validate_condition(cls, value: str | None) -> str | None:
+        if value is not None:
+            compile_condition(value)  # cached, so that it's compiled once
+        return value
+
+    @field_validator("cache_key", "cache_files")
+    @classmethod
+    def validate_templates(cls, value: Any) -> Any:
+        _compile_templates(value)
+        return value
+
+    @field_validator("matrix")
+    @classmethod
+    def validate_matrix(
+        cls, value: dict[str, list[InputValue]] | None
+    ) -> dict[str, list[InputValue]] | None:
+        if value is None:
+            return value
+        if not value:
+            raise ValueError("Matrix must have at least one variable")
+        for name, values in value.items():
+            if not values:
+                raise ValueError(f"Matrix variable {name} must have values")
+        keys = [
+            _matrix_key(dict(zip(value, c))) for c in itertools.product(*value.values())
+        ]
+        if len(set(keys)) != len(keys):
+            raise ValueError("Matrix combinations must have distinct keys")
+        for reserved_key in ("outputs", "metrics"):
+            if reserved_key in keys:
+                raise ValueError(f"Matrix key `{reserved_key}` is reserved")
+        return value
+
+    @model_validator(mode="after")
+    def validate_max_concurrency(self) -> Self:
+        if self.max_concurrency and not self.matrix and not hasattr(self, "steps"):
+            raise ValueError("max-concurrency is only supported on groups and matrices")
+        return self
 
     @property
     def id(self) -> str:
@@ -102,47 +175,132 @@ class BaseJobStep(BaseModel):
         suffix = hashlib.sha256(self.name.encode("utf-8")).hexdigest()[:8]
         return "__".join([prefix, slug, suffix])
 
+    def expand_matrix(self) -> list[tuple[dict[str, InputValue], Self]]:
+        if not self.matrix:
+            return []
+        instances = []
+        for combination in itertools.product(*self.matrix.values()):
+            values = dict(zip(self.matrix, combination))
+            key = _matrix_key(values)
+            instance = self.model_copy(
+                update={
+                    "provided_id": f"{self.id}.{key}",
+                    "name": f"{self.name} ({key})",
+                    "matrix": None,
+                }
+            )
+            instances.append((values, instance))
+        return instances
+
 
 class UseAction(BaseJobStep):
     kind: Literal["UseAction"] = "UseAction"
     uses: str
     params: dict = Field(default_factory=dict, alias="with")
+    # Params compiled at load time, to be rendered by the context.
+    _params_template: dict = PrivateAttr(default_factory=dict)
+
+    @model_validator(mode="after")
+    def compile_params(self) -> Self:
+        self._params_template = _compile_templates(self.params)
+        return self
+
+    @property
+    def params_template(self) -> dict:
+        return self._params_template
 
 
 class RunShell(BaseJobStep):
     kind: Literal["RunShell"] = "RunShell"
     run: str
     working_dir: str | None = Field(None, alias="working-dir")
+    _params_template: dict = PrivateAttr(default_factory=dict)
+
+    @property
+    def params(self) -> dict:
+        return {"script": self.run, "working-dir": self.working_dir}
+
+    @model_validator(mode="after")
+    def compile_params(self) -> Self:
+        self._params_template = _compile_templates(self.params)
+        return self
 
     def as_use_action_step(self) -> UseAction:
-        step_data = {
-            "id": self.provided_id,
-            "name": self.name,
-            "condition": self.condition,
-            "uses": "actions/shell",
-            "with": {
-                "script": self.run,
-                "working-dir": self.working_dir,
-            },
-        }
-        return UseAction(**step_data)
+        # The step is validated already: don't validate nor compile it again.
+        step = UseAction.model_construct(
+            provided_id=self.provided_id,
+            name=self.name,
+            condition=self.condition,
+            cache=self.cache,
+            cache_key=self.cache_key,
+            cache_files=self.cache_files,
+            uses="actions/shell",
+            params=self.params,
+        )
+        step._params_template = self._params_template
+        return step
 
 
 class StepsAction(BaseJobStep):
     kind: Literal["StepsAction"] = "StepsAction"
     steps: list["JobStep"]
+    # Run all child steps at the same time, regardless of their dependencies.
+    parallel: bool = False
+    # Stop starting new child steps as soon as one fails, or wait for all of them.
+    fail_fast: bool = Field(True, alias="fail-fast")
+
+    @model_validator(mode="after")
+    def validate_no_matrix(self) -> Self:
+        # Instances would share the IDs, hence the outputs, of the child steps.
+        if self.matrix:
+            raise ValueError("Matrix is not supported on steps groups")
+        return self
 
 
 JobStep = UseAction | RunShell | StepsAction
 
 
+def _construct_step(data: dict[str, Any]) -> JobStep:
+    step: JobStep
+    match data.get("kind"):
+        case "UseAction":
+            step = UseAction.model_construct(**data)
+            step._params_template = compile_templates(step.params)
+        case "RunShell":
+            step = RunShell.model_construct(**data)
+            step._params_template = compile_templates(step.params)
+        case "StepsAction":
+            steps = [_construct_step(child) for child in data["steps"]]
+            step = StepsAction.model_construct(**(data | {"steps": steps}))
+        case kind:
+            raise SlowhandException(f"Unknown step kind: {kind}")
+    return step
+
+
 class Job(BaseModel):
     job_id: str
     source: str
     name: str
     inputs: dict[str, JobInput] = Field(default_factory=dict)
+    # Opt-in: run shell steps in long-lived bash sessions (one per working dir),
+    # instead of a new bash process per step. Steps then share the shell state, and
+    # the resource usage of shell steps is not measured (see `slowhand.metrics`).
+    shell: Literal["default", "persistent"] = "default"
     steps: list[JobStep]
 
+    @classmethod
+    def construct_validated(cls, data: dict[str, Any]) -> "Job":
+        """
+        Build a job from the dump of a job which was validated already, e.g. cached in
+        the job catalog, skipping validation.
+        """
+        inputs = {
+            name: JobInput.model_construct(**input)
+            for name, input in data["inputs"].items()
+        }
+        steps = [_construct_step(step) for step in data["steps"]]
+        return cls.model_construct(**(data | {"inputs": inputs, "steps": steps}))
+
     def validate_steps(self):
         seen_step_ids = set()
         for step in self.steps:
@@ -0,0 +1,69 @@
+"""
+Static execution plan of a job, built without running anything: `if:` conditions are
+constant-folded with the inputs, meta and matrix variables, so that a step either
+definitely runs, is definitely skipped, or depends on the outputs of other steps.
+"""
+
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Literal
+
+from slowhand.context import Context
+from slowhand.expression import fold_condition
+from slowhand.models import JobStep
+
+PlanStatus = Literal["run", "skip", "runtime"]
+
+
+@dataclass(frozen=True)
+class StepPlan:
+    step_id: str
+    name: str
+    status: PlanStatus
+    # Child steps of a group, or instances of a matrix step. Not planned if skipped.
+    children: list["StepPlan"] = field(default_factory=list)
+
+
+def _get_status(step: JobStep, context: Context) -> PlanStatus:
+    if not step.condition:
+        return "run"
+    match fold_condition(step.condition, context=context):
+        case True:
+            return "run"
+        case False:
+            return "skip"
+        case _:
+            return "runtime"
+
+
+def _plan_step(step: JobStep, context: Context) -> StepPlan:
+    if step.matrix:
+        instances = [
+            _plan_step(instance, context.with_matrix(values))
+            for values, instance in step.expand_matrix()
+        ]
+        statuses = {instance.status for instance in instances}
+        status: PlanStatus = statuses.pop() if len(statuses) == 1 else "runtime"
+        return StepPlan(step.id, step.name, status, instances)
+
+    status = _get_status(step, context)
+    children = []
+    if status != "skip" and step.kind == "StepsAction":
+        children = plan_steps(step.steps, context)
+    return StepPlan(step.id, step.name, status, children)
+
+
+def plan_steps(steps: list[JobStep], context: Context) -> list[StepPlan]:
+    return [_plan_step(step, context) for step in steps]
+
+
+def iter_pruned_step_ids(plans: list[StepPlan]) -> Iterator[str]:
+    """
+    Yield IDs of the steps which are definitely skipped. Their children are pruned
+    with them.
+    """
+    for plan in plans:
+        if plan.status == "skip":
+            yield plan.step_id
+        else:
+            yield from iter_pruned_step_ids(plan.children)
@@ -0,0 +1,63 @@
+"""
+Discovery of third-party actions, registered in the `slowhand.actions` entry point
+group, e.g. in the `pyproject.toml` of a plugin:
+
+    [project.entry-points."slowhand.actions"]
+    "acme/deploy" = "acme_slowhand.deploy:Deploy"
+
+Scanning the installed distributions is slow, so the result is cached on disk. The
+cache is invalidated when the mtime of a `sys.path` directory changes, which happens
+when a distribution (and its metadata directory) is installed, upgraded or removed.
+"""
+
+import json
+import os
+import sys
+from functools import cache
+from importlib.metadata import entry_points
+from pathlib import Path
+
+from slowhand.config import ensure_app_user_dir
+from slowhand.logging import get_logger
+
+logger = get_logger(__name__)
+
+ENTRY_POINT_GROUP = "slowhand.actions"
+
+
+def _get_plugins_file() -> Path:
+    return ensure_app_user_dir() / "plugins.json"
+
+
+def _get_fingerprint() -> list[list[str | int]]:
+    fingerprint: list[list[str | int]] = []
+    for path in sys.path:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        fingerprint.append([path, stat.st_mtime_ns])
+    return fingerprint
+
+
+@cache
+def get_plugin_actions() -> dict[str, str]:
+    """
+    Return plugin actions, as a mapping of action names to "module:Class" strings.
+    """
+    fingerprint = _get_fingerprint()
+    plugins_file = _get_plugins_file()
+    try:
+        data = json.loads(plugins_file.read_text())
+        if data["fingerprint"] == fingerprint:
+            return data["actions"]
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning("Ignoring invalid plugins cache %s: %s", plugins_file, exc)
+
+    actions = {ep.name: ep.value for ep in entry_points(group=ENTRY_POINT_GROUP)}
+    tmp_file = plugins_file.with_name(f"{plugins_file.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(json.dumps({"fingerprint": fingerprint, "actions": actions}))
+    tmp_file.replace(plugins_file)
+    return actions
@@ -0,0 +1,153 @@
+"""
+Profiling of steps (`slowhand run --profile`), to tell the time spent in slowhand and
+actions from the time spent waiting for external tools. The profile of each step is
+saved in `<run_dir>/profiles/<step_id>.pstats`, e.g. for `python -m pstats` or
+snakeviz, and a report of the top functions of all steps is logged at the end.
+
+By default, steps are profiled with cProfile, which records every call. Since Python
+3.12, it profiles all threads and only one profiler can be enabled at a time: steps
+running at the same time as a profiled step are not profiled.
+
+With sampling, the stack of the thread running the step is sampled at a fixed interval
+instead, which does not slow down long-running steps. Samples are saved in the same
+format as cProfile, with one call per sample; steps shorter than the interval may have
+no samples, and no profile. With `--async`, all steps run on the event loop thread: the
+profile of a step also has the samples of the steps running at the same time (and of
+the event loop waiting for them).
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+
+from rich.markup import escape
+
+from slowhand.logging import get_logger
+
+logger = get_logger(__name__)
+
+_REPORT_TOP = 20
+
+# See above: only one cProfile profiler can be enabled at a time.
+_cprofile_lock = threading.Lock()
+
+FunctionKey = tuple[str, int, str]
+
+
+def get_profiles_dir(run_dir: Path) -> Path:
+    return run_dir / "profiles"
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, thread_id: int, interval: float) -> None:
+        super().__init__(name="slowhand-sampler", daemon=True)
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stopped = threading.Event()
+        # Same as `pstats.Stats.stats`, with lists to be updated in place.
+        self._stats: dict[FunctionKey, list] = {}
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._add_sample(frame)
+
+    def _add_sample(self, frame: FrameType | None) -> None:
+        stack: list[FunctionKey] = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        seen: set[FunctionKey] = set()
+        for depth, key in enumerate(stack):
+            entry = self._stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+            if depth == 0:
+                entry[2] += self._interval
+            if key in seen:  # recursive call
+                continue
+            seen.add(key)
+            entry[0] += 1
+            entry[1] += 1
+            entry[3] += self._interval
+            if depth + 1 < len(stack):
+                caller = entry[4].setdefault(stack[depth + 1], [0, 0, 0.0, 0.0])
+                caller[0] += 1
+                caller[1] += 1
+                caller[2] += self._interval if depth == 0 else 0.0
+                caller[3] += self._interval
+
+    def stop(self, stats_file: Path) -> None:
+        self._stopped.set()
+        self.join()
+        if not self._stats:  # pstats cannot load empty stats
+            return
+        stats = {
+            key: (cc, nc, tt, ct, {caller: tuple(s) for caller, s in callers.items()})
+            for key, (cc, nc, tt, ct, callers) in self._stats.items()
+        }
+        with stats_file.open("wb") as f:
+            marshal.dump(stats, f)
+
+
+@contextmanager
+def profile_step(
+    step_id: str, profiles_dir: Path, *, interval: float | None = None
+) -> Iterator[None]:
+    """
+    Profile the enclosed code, run by a step, with cProfile or else by sampling the
+    current thread every `interval` seconds.
+    """
+    profiles_dir.mkdir(parents=True, exist_ok=True)
+    stats_file = profiles_dir / f"{step_id}.pstats"
+
+    if interval is not None:
+        sampler = _Sampler(threading.get_ident(), interval)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop(stats_file)
+        return
+
+    if not _cprofile_lock.acquire(blocking=False):
+        logger.warning("Not profiling step %s: another step is profiled", step_id)
+        yield
+        return
+    try:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as exc:  # e.g. another profiling tool is active
+            logger.warning("Not profiling step %s: %s", step_id, exc)
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(stats_file)
+    finally:
+        _cprofile_lock.release()
+
+
+def log_profile_report(profiles_dir: Path) -> None:
+    stats_files = sorted(profiles_dir.glob("*.pstats"))
+    if not stats_files:
+        return
+    stream = io.StringIO()
+    stats = pstats.Stats(*(str(f) for f in stats_files), stream=stream)
+    stats.strip_dirs().sort_stats(pstats.SortKey.TIME).print_stats(_REPORT_TOP)
+    logger.info(
+        "Top functions of %d profiled step(s), by own time:\n%s",
+        len(stats_files),
+        escape(stream.getvalue().strip()),
+    )
+    logger.info("Step profiles are saved in: %s", profiles_dir)
@@ -1,69 +1,459 @@
+import asyncio
 import json
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import copy_context
+from dataclasses import dataclass, field, replace
+from functools import partial
+from pathlib import Path
 from textwrap import indent
+from typing import Any, TypeVar
 
 from slowhand.actions import create_action
-from slowhand.config import settings
-from slowhand.context import Context
+from slowhand.cache import compute_cache_key, load_cached_outputs, save_cached_outputs
+from slowhand.config import get_settings
+from slowhand.context import Context, SimpleValue
 from slowhand.errors import SlowhandException
 from slowhand.expression import evaluate_condition
-from slowhand.logging import alert, get_logger, muted, primary
-from slowhand.models import Job, JobStep
+from slowhand.logging import alert, get_logger, log_prefix, muted, primary
+from slowhand.metrics import UsageMeter, format_metrics_table
+from slowhand.models import Job, JobStep, RunShell, UseAction
+from slowhand.planner import iter_pruned_step_ids, plan_steps
+from slowhand.profiling import get_profiles_dir, log_profile_report, profile_step
+from slowhand.scheduler import StepQueue, build_dependencies
+from slowhand.tracing import span
+from slowhand.utils import ShellSessionPool
 
 logger = get_logger(__name__)
 
+# Max number of matrix instances running at the same time, unless `max-concurrency` is
+# set on the matrix step.
+_MAX_MATRIX_CONCURRENCY = 16
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RunOptions:
+    dry_run: bool = False
+    max_parallel: int = 1  # max number of steps running at the same time in a group
+    # Run steps on an asyncio event loop, with native coroutines of async actions.
+    use_async: bool = False
+    # Steps which are definitely skipped according to the plan of the job.
+    pruned_step_ids: frozenset[str] = frozenset()
+    # Profile action steps, with cProfile or else by sampling at this interval.
+    profile: bool = False
+    profile_interval: float | None = None  # in seconds
+
+
+# A task runs a step. It is identified by the step ID (to prefix its logs).
+Task = tuple[str, Callable[[], T]]
+
+
+def _log_info(msg: str, depth: int) -> None:
+    logger.info(indent(msg, "  " * depth))
+
+
+def _get_skip_reason(step: JobStep, context: Context) -> str | None:
+    if context.has_step_outputs(step.id):
+        return "already run"
+    if step.condition and not evaluate_condition(step.condition, context=context):
+        return "condition not met"
+    return None
+
+
+def _as_use_action(step: UseAction | RunShell) -> UseAction:
+    if step.kind == "RunShell":
+        step = step.as_use_action_step()
+    if step.kind != "UseAction":
+        raise SlowhandException(f"Unknown step kind: {step.kind}")
+    return step
+
+
+def _make_queue(
+    steps: list[JobStep],
+    options: RunOptions,
+    *,
+    parallel: bool = False,
+    max_concurrency: int | None = None,
+    fail_fast: bool = True,
+) -> tuple[StepQueue, int]:
+    if parallel:
+        queue = StepQueue([set() for _ in steps], fail_fast=fail_fast)
+        limit = max_concurrency or len(steps)
+    else:
+        queue = StepQueue(build_dependencies(steps), fail_fast=fail_fast)
+        limit = max_concurrency or options.max_parallel
+    return queue, limit
+
+
+def _raise_errors(queue: StepQueue, tasks: list[Task]) -> None:
+    errors = queue.errors
+    if len(errors) > 1:
+        for index, error in errors.items():
+            logger.error("Step %s failed: %s", tasks[index][0], error)
+    queue.raise_first_error()
+
+
+def _get_cache_key(step: UseAction, params: dict, context: Context) -> str | None:
+    if not step.cache and not step.cache_key:
+        return None
+    base_dir = params.get("working-dir") or context.run_dir
+    return compute_cache_key(
+        step.uses,
+        params,
+        key=context.resolve(step.cache_key),
+        files=context.resolve(step.cache_files),
+        base_dir=Path(base_dir),
+        run_dir=context.run_dir,
+    )
+
+
+def _load_cached_outputs(
+    cache_key: str | None, depth: int
+) -> dict[str, SimpleValue] | None:
+    if not cache_key:
+        return None
+    outputs = load_cached_outputs(cache_key)
+    if outputs is not None:
+        _log_info(f"↺ Restored outputs from cache: {muted(cache_key[:12])}", depth)
+    return outputs
+
+
+def _save_cached_outputs(
+    cache_key: str | None, outputs: dict[str, SimpleValue] | None, options: RunOptions
+) -> None:
+    if cache_key and not options.dry_run:
+        save_cached_outputs(cache_key, outputs or {})
+
+
+def _save_step_outputs(
+    step_id: str, outputs: dict[str, SimpleValue] | None, context: Context, depth: int
+) -> None:
+    if outputs:
+        _log_info(json.dumps(outputs, indent=2), depth)
+    context.save_step_outputs(step_id, outputs)
+
+
+@contextmanager
+def _record_metrics(step_id: str, context: Context) -> Iterator[None]:
+    """
+    Save resource usage of an action step, even if it fails.
+    """
+    meter = UsageMeter()
+    try:
+        yield
+    finally:
+        context.save_step_metrics(step_id, meter.read())
+
+
+def _profile_step(
+    step: JobStep, context: Context, options: RunOptions
+) -> AbstractContextManager[None]:
+    """
+    Profile a step running an action, including the overhead of the runner around it:
+    evaluating its condition, rendering its params and saving its outputs.
+    """
+    if (
+        not options.profile
+        or step.kind == "StepsAction"
+        or step.matrix
+        or step.id in options.pruned_step_ids
+    ):
+        return nullcontext()
+    return profile_step(
+        step.id,
+        get_profiles_dir(context.run_dir),
+        interval=options.profile_interval,
+    )
+
+
+def _log_reports(context: Context, options: RunOptions) -> None:
+    if options.profile:
+        log_profile_report(get_profiles_dir(context.run_dir))
+    step_metrics = context.get_step_metrics()
+    if step_metrics:
+        logger.info(
+            "Step metrics:\n%s", indent(format_metrics_table(step_metrics), "    ")
+        )
+
+
+def _run_step(step: JobStep, context: Context, options: RunOptions, depth: int):
+    step_id = step.id
+    step_desc = f"{primary(step.name)} ({muted(step_id)})"
+
+    with (
+        span(step.name, "step", new_lane=True, id=step_id),
+        _profile_step(step, context, options),
+    ):
+        if step_id in options.pruned_step_ids:
+            # The whole subtree is skipped, without evaluating anything.
+            _log_info(f"○ Skipping step: {step_desc} (pruned by plan)", depth)
+            return
+
+        if step.matrix:
+            _log_info(f"● Expanding matrix step: {step_desc}", depth)
+            _run_matrix(step, context, options, depth)
+            return
+
+        skip_reason = _get_skip_reason(step, context)
+        if skip_reason:
+            _log_info(f"○ Skipping step: {step_desc} ({skip_reason})", depth)
+            return
+
+        _log_info(f"● Running step: {step_desc}", depth)
+
+        if step.kind == "StepsAction":
+            _run_steps(
+                step.steps,
+                context,
+                options,
+                depth=depth + 1,
+                parallel=step.parallel,
+                max_concurrency=step.max_concurrency,
+                fail_fast=step.fail_fast,
+            )
+        else:
+            step = _as_use_action(step)
+            action = create_action(step.uses)
+            params = context.render(step.params_template)
+            cache_key = _get_cache_key(step, params, context)
+            with _record_metrics(step_id, context):
+                outputs = _load_cached_outputs(cache_key, depth)
+                if outputs is None:
+                    outputs = action.run(
+                        params, context=context, dry_run=options.dry_run
+                    )
+                    _save_cached_outputs(cache_key, outputs, options)
+            _save_step_outputs(step_id, outputs, context, depth)
+
+
+def _run_tasks(queue: StepQueue, tasks: list[Task[None]], limit: int):
+    """
+    Run tasks (one per step) as they get ready in the queue.
+    """
+    if limit <= 1:
+        while ready := queue.take_ready(1):
+            index = ready[0]
+            try:
+                tasks[index][1]()
+            except Exception as exc:
+                queue.complete(index, exc)
+            else:
+                queue.complete(index)
+    else:
+
+        def run_task(index: int) -> None:
+            step_id, task = tasks[index]
+            with log_prefix(step_id):
+                task()
+
+        with ThreadPoolExecutor(max_workers=limit) as executor:
+            futures: dict[Future, int] = {}
+            while True:
+                for index in queue.take_ready(limit):
+                    # Run in a copy of the current context so context vars propagate.
+                    future = executor.submit(copy_context().run, run_task, index)
+                    futures[future] = index
+                if not futures:
+                    break
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    queue.complete(futures.pop(future), future.exception())
+
+    _raise_errors(queue, tasks)
+
+
+def _get_matrix_limit(step: JobStep, instance_count: int) -> int:
+    return step.max_concurrency or min(instance_count, _MAX_MATRIX_CONCURRENCY)
+
+
+def _run_matrix(step: JobStep, context: Context, options: RunOptions, depth: int):
+    tasks: list[Task[None]] = [
+        (
+            instance.id,
+            partial(_run_step, instance, context.with_matrix(values), options, depth),
+        )
+        for values, instance in step.expand_matrix()
+    ]
+    queue = StepQueue([set() for _ in tasks])
+    _run_tasks(queue, tasks, _get_matrix_limit(step, len(tasks)))
+
 
 def _run_steps(
-    steps: list[JobStep], context: Context, *, dry_run: bool = False, depth: int = 0
+    steps: list[JobStep],
+    context: Context,
+    options: RunOptions,
+    *,
+    depth: int = 0,
+    **group_options: Any,
 ):
-    def log_info(msg: str) -> None:
-        logger.info(indent(msg, "  " * depth))
-
-    for step in steps:
-        step_id = step.id
-        step_desc = f"{primary(step.name)} ({muted(step_id)})"
-
-        skip_reason = None
-        if context.has_step_outputs(step_id):
-            skip_reason = "already run"
-        elif step.condition and not evaluate_condition(step.condition, context=context):
-            skip_reason = "condition not met"
+    queue, limit = _make_queue(steps, options, **group_options)
+    tasks: list[Task[None]] = [
+        (step.id, partial(_run_step, step, context, options, depth)) for step in steps
+    ]
+    _run_tasks(queue, tasks, limit)
+
+
+async def _run_step_async(
+    step: JobStep, context: Context, options: RunOptions, depth: int
+):
+    step_id = step.id
+    step_desc = f"{primary(step.name)} ({muted(step_id)})"
+
+    with (
+        span(step.name, "step", new_lane=True, id=step_id),
+        _profile_step(step, context, options),
+    ):
+        if step_id in options.pruned_step_ids:
+            # The whole subtree is skipped, without evaluating anything.
+            _log_info(f"○ Skipping step: {step_desc} (pruned by plan)", depth)
+            return
+
+        if step.matrix:
+            _log_info(f"● Expanding matrix step: {step_desc}", depth)
+            await _run_matrix_async(step, context, options, depth)
+            return
+
+        skip_reason = _get_skip_reason(step, context)
         if skip_reason:
-            log_info(f"○ Skipping step: {step_desc} ({skip_reason})")
-            continue
+            _log_info(f"○ Skipping step: {step_desc} ({skip_reason})", depth)
+            return
 
-        log_info(f"● Running step: {step_desc}")
+        _log_info(f"● Running step: {step_desc}", depth)
 
         if step.kind == "StepsAction":
-            _run_steps(step.steps, context, dry_run=dry_run, depth=depth + 1)
+            await _run_steps_async(
+                step.steps,
+                context,
+                options,
+                depth=depth + 1,
+                parallel=step.parallel,
+                max_concurrency=step.max_concurrency,
+                fail_fast=step.fail_fast,
+            )
         else:
-            if step.kind == "RunShell":
-                step = step.as_use_action_step()
-            if step.kind != "UseAction":
-                raise SlowhandException(f"Unknown step kind: {step.kind}")
+            step = _as_use_action(step)
             action = create_action(step.uses)
-            params = context.resolve(step.params or {})
-            outputs = action.run(params, context=context, dry_run=dry_run)
-            if outputs:
-                log_info(json.dumps(outputs, indent=2))
-            context.save_step_outputs(step_id, outputs)
+            params = context.render(step.params_template)
+            cache_key = _get_cache_key(step, params, context)
+            with _record_metrics(step_id, context):
+                outputs = _load_cached_outputs(cache_key, depth)
+                if outputs is None:
+                    outputs = await action.run_async(
+                        params, context=context, dry_run=options.dry_run
+                    )
+                    _save_cached_outputs(cache_key, outputs, options)
+            _save_step_outputs(step_id, outputs, context, depth)
+
+
+async def _run_tasks_async(
+    queue: StepQueue, tasks: list[Task[Awaitable[None]]], limit: int
+):
+    """
+    Run tasks (one per step) as they get ready in the queue, on the event loop.
+    """
+
+    async def run_task(index: int) -> None:
+        step_id, task = tasks[index]
+        if limit <= 1:
+            await task()
+        else:
+            with log_prefix(step_id):
+                await task()
+
+    # Each asyncio task runs in a copy of the current context.
+    running: dict[asyncio.Task, int] = {}
+    while True:
+        for index in queue.take_ready(limit):
+            running[asyncio.create_task(run_task(index))] = index
+        if not running:
+            break
+        finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in finished:
+            queue.complete(running.pop(task), task.exception())
+
+    _raise_errors(queue, tasks)
+
+
+async def _run_matrix_async(
+    step: JobStep, context: Context, options: RunOptions, depth: int
+):
+    tasks: list[Task[Awaitable[None]]] = [
+        (
+            instance.id,
+            partial(
+                _run_step_async, instance, context.with_matrix(values), options, depth
+            ),
+        )
+        for values, instance in step.expand_matrix()
+    ]
+    queue = StepQueue([set() for _ in tasks])
+    await _run_tasks_async(queue, tasks, _get_matrix_limit(step, len(tasks)))
+
+
+async def _run_steps_async(
+    steps: list[JobStep],
+    context: Context,
+    options: RunOptions,
+    *,
+    depth: int = 0,
+    **group_options: Any,
+):
+    queue, limit = _make_queue(steps, options, **group_options)
+    tasks: list[Task[Awaitable[None]]] = [
+        (step.id, partial(_run_step_async, step, context, options, depth))
+        for step in steps
+    ]
+    await _run_tasks_async(queue, tasks, limit)
+
+
+@dataclass(frozen=True)
+class JobResult:
+    job_id: str
+    run_id: str
+    succeeded: bool
+    duration: float  # in seconds
+    outputs: dict[str, SimpleValue] = field(default_factory=dict)
+    error: str | None = None
 
 
 def _run_job_with_context(
-    job: Job, context: Context, *, dry_run: bool = False, clean: bool = True
-) -> None:
+    job: Job, context: Context, options: RunOptions, *, clean: bool = True
+) -> JobResult:
     if job.job_id != context.job_id:
         raise SlowhandException(
             f"Job {job.job_id} does not match context {context.job_id}"
         )
 
+    start = time.monotonic()
+    error: str | None = None
     try:
         logger.info(
             "» Running job: %s%s",
             primary(job.name),
-            muted(" (dry-run)") if dry_run else "",
+            muted(" (dry-run)") if options.dry_run else "",
         )
-        _run_steps(job.steps, context, dry_run=dry_run)
+        pruned_step_ids = iter_pruned_step_ids(plan_steps(job.steps, context))
+        options = replace(options, pruned_step_ids=frozenset(pruned_step_ids))
+        if job.shell == "persistent":
+            context.shell_sessions = ShellSessionPool()
+        try:
+            with span(
+                job.name, "job", new_lane=True, id=job.job_id, run_id=context.run_id
+            ):
+                if options.use_async:
+                    asyncio.run(_run_steps_async(job.steps, context, options))
+                else:
+                    _run_steps(job.steps, context, options)
+        finally:
+            if context.shell_sessions is not None:
+                context.shell_sessions.close()
+                context.shell_sessions = None
 
+        _log_reports(context, options)
         logger.info("✓ Job completed successfully.")
         job_outputs = context.get_outputs()
         if job_outputs:
@@ -72,30 +462,55 @@ def _run_job_with_context(
                 logger.info(f"    {name} = {value}")
 
         context.delete_checkpoint()
-        if clean and not settings.debug:
+        # Keep the profiles of the steps.
+        if clean and not get_settings().debug and not options.profile:
             context.teardown()
 
     except Exception as exc:
+        error = str(exc)
+        _log_reports(context, options)
         logger.error("Job %s failed: %s", job.name, exc)
         checkpoint_file = context.save_checkpoint()
         logger.info("Saved checkpoint at: %s", alert(checkpoint_file))
         logger.info("Run dir is kept: %s", alert(context.run_dir))
-        if settings.debug:
+        if get_settings().debug:
             raise
 
     finally:
-        if settings.debug:
+        if get_settings().debug:
             logger.info("Dumping context state:\n%s", context.dump_state_json())
 
+    return JobResult(
+        job_id=job.job_id,
+        run_id=context.run_id,
+        succeeded=error is None,
+        duration=time.monotonic() - start,
+        outputs=dict(context.get_outputs()),
+        error=error,
+    )
+
 
 def run_job(
-    job: Job, inputs: dict[str, str], *, dry_run: bool = False, clean: bool = True
-) -> None:
+    job: Job,
+    inputs: dict[str, str],
+    *,
+    options: RunOptions | None = None,
+    clean: bool = True,
+) -> JobResult:
+    # Validate inputs first, not to leave a resumable run behind if they are invalid.
+    input_values = job.parse_inputs(inputs)
     context = Context(job.job_id)
-    context.save_inputs(job.parse_inputs(inputs))
-    _run_job_with_context(job, context, dry_run=dry_run, clean=clean)
+    context.start_journal()
+    context.save_inputs(input_values)
+    return _run_job_with_context(job, context, options or RunOptions(), clean=clean)
 
 
-def resume_job(job: Job, *, dry_run: bool = False, clean: bool = True) -> None:
-    context = Context.load_checkpoint()
-    _run_job_with_context(job, context, dry_run=dry_run, clean=clean)
+def resume_job(
+    job: Job,
+    *,
+    run_id: str | None = None,
+    options: RunOptions | None = None,
+    clean: bool = True,
+) -> JobResult:
+    context = Context.load_checkpoint(job.job_id, run_id=run_id)
+    return _run_job_with_context(job, context, options or RunOptions(), clean=clean)
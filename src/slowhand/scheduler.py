@@ -0,0 +1,115 @@
+"""
+Dependency analysis used by the runner to run independent steps concurrently.
+
+A step depends on:
+
+- every earlier step whose outputs it references (`steps.<id>.outputs.*`, or
+  `steps.<id>.<key>.outputs.*` for matrix instances), either in its params, its
+  script, its working dir or its `if:` condition. Referencing the outputs of a step
+  nested in a group is a dependency on the group;
+- the latest earlier step which references the same producer. Steps consuming the
+  outputs of a same step (e.g. a cloned repo) usually work on the same resources, so
+  they keep their file order.
+
+Forward references are ignored: they are resolved to empty strings anyway.
+"""
+
+import re
+from collections.abc import Iterator
+from typing import Any
+
+from slowhand.models import JobStep
+
+_STEP_REF_REGEX = re.compile(r"\bsteps\.([\w-]+)\.(?:[\w-]+\.)?outputs\.")
+
+
+def _iter_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_strings(item)
+
+
+def find_step_references(step: JobStep) -> set[str]:
+    refs: set[str] = set()
+    for text in _iter_strings(step.model_dump()):
+        refs.update(_STEP_REF_REGEX.findall(text))
+    return refs
+
+
+def _iter_step_ids(step: JobStep) -> Iterator[str]:
+    yield step.id
+    if step.kind == "StepsAction":
+        for child in step.steps:
+            yield from _iter_step_ids(child)
+
+
+def build_dependencies(steps: list[JobStep]) -> list[set[int]]:
+    index_by_id: dict[str, int] = {}
+    last_consumers: dict[int, int] = {}  # producer index -> latest consumer index
+    dependencies: list[set[int]] = []
+    for index, step in enumerate(steps):
+        producers = {
+            index_by_id[ref] for ref in find_step_references(step) if ref in index_by_id
+        }
+        step_dependencies = set(producers)
+        for producer in producers:
+            if producer in last_consumers:
+                step_dependencies.add(last_consumers[producer])
+            last_consumers[producer] = index
+        dependencies.append(step_dependencies)
+        for step_id in _iter_step_ids(step):
+            index_by_id[step_id] = index
+    return dependencies
+
+
+class StepQueue:
+    """
+    Track the progress of a list of steps and hand out the ones that are ready to run.
+    Ready steps are always taken in file order, which keeps the execution order (and
+    thus logs and checkpoints) deterministic for a given `limit`.
+
+    With `fail_fast`, no new step is started after a failure. Otherwise, all the steps
+    not depending on a failed step are still run.
+    """
+
+    def __init__(self, dependencies: list[set[int]], *, fail_fast: bool = True) -> None:
+        self._dependencies = dependencies
+        self._fail_fast = fail_fast
+        self._pending = list(range(len(dependencies)))
+        self._running: set[int] = set()
+        self._done: set[int] = set()
+        self._errors: dict[int, BaseException] = {}
+
+    def take_ready(self, limit: int) -> list[int]:
+        if self._errors and self._fail_fast:
+            return []  # don't start new steps after a failure
+        ready: list[int] = []
+        for index in self._pending:
+            if len(self._running) + len(ready) >= limit:
+                break
+            if self._dependencies[index] <= self._done:
+                ready.append(index)
+        for index in ready:
+            self._pending.remove(index)
+            self._running.add(index)
+        return ready
+
+    def complete(self, index: int, error: BaseException | None = None) -> None:
+        self._running.discard(index)
+        if error is None:
+            self._done.add(index)
+        else:
+            self._errors[index] = error
+
+    @property
+    def errors(self) -> dict[int, BaseException]:
+        return dict(sorted(self._errors.items()))
+
+    def raise_first_error(self) -> None:
+        if self._errors:
+            raise self._errors[min(self._errors)]
@@ -0,0 +1,78 @@
+"""
+Templates are strings referencing context variables, in `${{ foo.bar }}` format to be
+distinguished from a normal shell variable (`$foobar`).
+
+They are compiled once (when a job is loaded) into segments of literal strings and
+variable references, so that rendering them is a flat join of state lookups.
+"""
+
+import re
+from typing import Any, NamedTuple
+
+from slowhand.errors import SlowhandException
+
+_VAR_REGEX = re.compile(r"\${{([^}]+)}}")
+
+_VAR_NAME_REGEX = re.compile(
+    r"^(?:"
+    r"meta\.[\w-]+"
+    r"|inputs\.[\w-]+"
+    r"|outputs\.[\w-]+"
+    r"|matrix\.[\w-]+"
+    r"|steps\.[\w-]+\.(?:[\w-]+\.)?outputs\.[\w-]+"  # with optional matrix key
+    r")$"
+)
+
+
+class VariableRef(NamedTuple):
+    name: str
+    keys: tuple[str, ...]
+
+
+class Template:
+    __slots__ = ("source", "segments")
+
+    def __init__(self, source: str, segments: tuple[str | VariableRef, ...]) -> None:
+        self.source = source
+        self.segments = segments
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
+
+
+def parse_variable(var_name: str) -> VariableRef:
+    var_name = var_name.strip()
+    if not _VAR_NAME_REGEX.match(var_name):
+        raise SlowhandException(f"Invalid variable name: {var_name}")
+    return VariableRef(var_name, tuple(var_name.split(".")))
+
+
+def compile_template(text: str) -> str | Template:
+    """
+    Compile a string into a template, or return it as is if it has no variables.
+    """
+    segments: list[str | VariableRef] = []
+    pos = 0
+    for m in _VAR_REGEX.finditer(text):
+        if m.start() > pos:
+            segments.append(text[pos : m.start()])
+        segments.append(parse_variable(m.group(1)))
+        pos = m.end()
+    if not segments:
+        return text
+    if pos < len(text):
+        segments.append(text[pos:])
+    return Template(text, tuple(segments))
+
+
+def compile_templates(value: Any) -> Any:
+    """
+    Compile all strings of a (nested) value into templates.
+    """
+    if isinstance(value, str):
+        return compile_template(value)
+    if isinstance(value, dict):
+        return {key: compile_templates(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [compile_templates(item) for item in value]
+    return value
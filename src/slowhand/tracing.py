@@ -0,0 +1,163 @@
+"""
+Trace of a job run in the Chrome trace event format, viewable offline in Perfetto
+(https://ui.perfetto.dev) or `chrome://tracing`: spans of the job, its steps, the
+subprocesses and the HTTP calls they make.
+
+Tracing is enabled per run (`slowhand run --trace trace.json`), through a context
+variable inherited by the threads and tasks running the steps. When it's disabled,
+`span()` returns a shared no-op context manager.
+
+Spans are laid out on lanes (shown as threads), so that the spans of a lane are nested
+as the trace format requires, even when steps run concurrently: the job and each step
+take the first free lane, and other spans go on the lane of their step.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self._start_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._events: list[dict[str, Any]] = []
+        self._lane_count = 0
+        self._free_lanes: list[int] = []
+
+    def acquire_lane(self) -> int:
+        with self._lock:
+            if self._free_lanes:
+                return heapq.heappop(self._free_lanes)
+            self._lane_count += 1
+            lane = self._lane_count
+            self._events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": lane,
+                    "args": {"name": f"lane {lane}"},
+                }
+            )
+            return lane
+
+    def release_lane(self, lane: int) -> None:
+        with self._lock:
+            heapq.heappush(self._free_lanes, lane)
+
+    def add_span(
+        self,
+        name: str,
+        category: str,
+        start_ns: int,
+        end_ns: int,
+        args: dict[str, Any],
+    ) -> None:
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_ns - self._start_ns) / 1000,  # in microseconds
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": self._pid,
+            "tid": _lane.get(),
+            "args": args,
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def save(self, trace_file: Path) -> None:
+        with self._lock:
+            data = {"traceEvents": self._events, "displayTimeUnit": "ms"}
+            trace_file.write_text(json.dumps(data))
+
+
+_tracer: ContextVar[Tracer | None] = ContextVar("tracer", default=None)
+
+_lane: ContextVar[int] = ContextVar("lane", default=0)
+
+_NO_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+class _Span(AbstractContextManager[None]):
+    __slots__ = (
+        "_tracer",
+        "_name",
+        "_category",
+        "_args",
+        "_new_lane",
+        "_token",
+        "_start_ns",
+    )
+
+    def __init__(
+        self,
+        tracer: Tracer,
+        name: str,
+        category: str,
+        args: dict[str, Any],
+        new_lane: bool,
+    ) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+        self._new_lane = new_lane
+        self._token: Token[int] | None = None
+        self._start_ns = 0
+
+    def __enter__(self) -> None:
+        if self._new_lane:
+            self._token = _lane.set(self._tracer.acquire_lane())
+        self._start_ns = time.perf_counter_ns()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        args = self._args
+        if exc_value is not None:
+            args = args | {"error": f"{type(exc_value).__name__}: {exc_value}"}
+        self._tracer.add_span(
+            self._name, self._category, self._start_ns, time.perf_counter_ns(), args
+        )
+        if self._token is not None:
+            self._tracer.release_lane(_lane.get())
+            _lane.reset(self._token)
+
+
+def span(
+    name: str, category: str, *, new_lane: bool = False, **args: Any
+) -> AbstractContextManager[None]:
+    """
+    Record the enclosed code as a span, if tracing is enabled. With `new_lane`, the
+    span and the spans it encloses are laid out on the first free lane.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        return _NO_SPAN
+    return _Span(tracer, name, category, args, new_lane)
+
+
+@contextmanager
+def tracing(trace_file: Path | None) -> Iterator[None]:
+    """
+    Enable tracing in the enclosed code, and save the trace to `trace_file`. Do
+    nothing if `trace_file` is None.
+    """
+    if trace_file is None:
+        yield
+        return
+    tracer = Tracer()
+    token = _tracer.set(tracer)
+    try:
+        yield
+    finally:
+        _tracer.reset(token)
+        tracer.save(trace_file)
@@ -1,12 +1,23 @@
+import asyncio
+import fcntl
 import os
 import random
+import selectors
+import shlex
 import subprocess
+import threading
 import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 from textwrap import dedent
-from typing import Any
+from typing import IO, Any
+
+from rich.markup import escape
 
 from slowhand.logging import get_logger
+from slowhand.tracing import span
 
 logger = get_logger(__name__)
 
@@ -21,6 +32,39 @@ def random_name(prefix: str | None = None) -> str:
     return f"{prefix}_{timestamp:012x}{suffix:06x}"
 
 
+@contextmanager
+def file_lock(
+    lock_file: Path, *, shared: bool = False, blocking: bool = True
+) -> Iterator[None]:
+    """
+    Hold an advisory lock on a file, shared between processes. Raise `BlockingIOError`
+    if not `blocking` and the lock is held by another process.
+    """
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with lock_file.open("a") as f:
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        fcntl.flock(f, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def parse_key_values(args: list[str]) -> dict[str, str]:
+    """
+    Parse arguments in `<key>=<value>` format.
+    """
+    result = {}
+    for arg in args:
+        tokens = arg.split("=", 1)
+        if len(tokens) != 2:
+            raise ValueError(f"Input must be in format <key>=<value>: {arg}")
+        result[tokens[0]] = tokens[1]
+    return result
+
+
 def _get_subprocess_kwargs(
     cwd: Path | str | None = None,
     extra_env: dict[str, str] | None = None,
@@ -33,11 +77,91 @@ def _get_subprocess_kwargs(
     return kwargs
 
 
+# Only the last lines of output are kept for error messages, when not captured.
+_OUTPUT_TAIL_LINES = 100
+
+_READ_SIZE = 64 * 1024
+
+# Longer lines (e.g. progress bars without newlines) are split.
+_MAX_LINE_SIZE = 1024 * 1024
+
+
+class _OutputStream:
+    """
+    Split the output of a subprocess in lines as it is read, logging them if `log`.
+    """
+
+    def __init__(self, *, log: bool, capture: bool = False) -> None:
+        self._log = log
+        self._buffer = b""
+        self._captured: list[str] | None = [] if capture else None
+        self._tail: deque[str] = deque(maxlen=_OUTPUT_TAIL_LINES)
+
+    def feed(self, data: bytes) -> None:
+        lines = (self._buffer + data).split(b"\n")
+        self._buffer = lines.pop()
+        for line in lines:
+            self._add_line(line)
+        if len(self._buffer) > _MAX_LINE_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._add_line(self._buffer)
+            self._buffer = b""
+
+    def _add_line(self, data: bytes) -> None:
+        line = data.decode(errors="replace").rstrip("\r")
+        if self._log:
+            logger.info("%s", escape(line))
+        if self._captured is not None:
+            self._captured.append(line)
+        else:
+            self._tail.append(line)
+
+    @property
+    def text(self) -> str:
+        """
+        Captured output, or else the last lines of output.
+        """
+        lines = self._tail if self._captured is None else self._captured
+        return "\n".join(lines)
+
+
+def _read_outputs(pipes: dict[IO[bytes], _OutputStream]) -> None:
+    with selectors.DefaultSelector() as selector:
+        for pipe, stream in pipes.items():
+            os.set_blocking(pipe.fileno(), False)
+            selector.register(pipe, selectors.EVENT_READ, stream)
+        while selector.get_map():
+            for key, _ in selector.select():
+                try:
+                    data = os.read(key.fd, _READ_SIZE)
+                except BlockingIOError:
+                    continue
+                if data:
+                    key.data.feed(data)
+                else:
+                    key.data.flush()
+                    selector.unregister(key.fileobj)
+
+
+async def _read_output_async(pipe: asyncio.StreamReader, stream: _OutputStream) -> None:
+    while data := await pipe.read(_READ_SIZE):
+        stream.feed(data)
+    stream.flush()
+
+
 def run_command(
     *args: str,
     cwd: Path | str | None = None,
     extra_env: dict[str, str] | None = None,
+    stream: bool = False,
 ) -> str:
+    """
+    Run a command and return its stdout. If `stream`, log its output as it runs, e.g.
+    to show the progress of long commands.
+    """
     kwargs = _get_subprocess_kwargs(cwd=cwd, extra_env=extra_env)
     logger.debug(
         "Running command",
@@ -47,28 +171,76 @@ def run_command(
             "extra_env": extra_env,
         },
     )
-    result = subprocess.run(
-        list(args),
-        capture_output=True,
-        text=True,
-        check=True,
-        **kwargs,
-    )
-    return result.stdout.strip()
+    stdout = _OutputStream(log=stream, capture=True)
+    stderr = _OutputStream(log=stream)
+    with (
+        span(args[0], "subprocess", command=" ".join(args), cwd=str(cwd or "")),
+        subprocess.Popen(
+            list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs
+        ) as process,
+    ):
+        assert process.stdout and process.stderr
+        _read_outputs({process.stdout: stdout, process.stderr: stderr})
+    if process.returncode:
+        raise subprocess.CalledProcessError(
+            process.returncode, list(args), output=stdout.text, stderr=stderr.text
+        )
+    return stdout.text.strip()
 
 
-def run_shell_script(
-    script: str,
-    *,
+async def run_command_async(
+    *args: str,
     cwd: Path | str | None = None,
     extra_env: dict[str, str] | None = None,
-) -> None:
-    script = "\n".join(
+    stream: bool = False,
+) -> str:
+    kwargs = _get_subprocess_kwargs(cwd=cwd, extra_env=extra_env)
+    logger.debug(
+        "Running command",
+        extra={
+            "command": " ".join(args),
+            "cwd": cwd,
+            "extra_env": extra_env,
+        },
+    )
+    with span(args[0], "subprocess", command=" ".join(args), cwd=str(cwd or "")):
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **kwargs,
+        )
+        assert process.stdout and process.stderr
+        stdout = _OutputStream(log=stream, capture=True)
+        stderr = _OutputStream(log=stream)
+        await asyncio.gather(
+            _read_output_async(process.stdout, stdout),
+            _read_output_async(process.stderr, stderr),
+        )
+        returncode = await process.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(
+            returncode, list(args), output=stdout.text, stderr=stderr.text
+        )
+    return stdout.text.strip()
+
+
+def _make_shell_script(script: str) -> str:
+    return "\n".join(
         [
             "set -e",  # to exit (with non-zero code) on first error
             dedent(script).strip(),
         ]
     )
+
+
+def run_shell_script(
+    script: str,
+    *,
+    cwd: Path | str | None = None,
+    extra_env: dict[str, str] | None = None,
+) -> None:
+    script = _make_shell_script(script)
     kwargs = _get_subprocess_kwargs(cwd=cwd, extra_env=extra_env)
     logger.debug(
         "Running shell script",
@@ -78,10 +250,176 @@ def run_shell_script(
             "extra_env": extra_env,
         },
     )
-    subprocess.run(
-        script,
-        shell=True,
-        check=True,  # raise if script exits with non-zero code
-        executable="/bin/bash",
-        **kwargs,
+    # Output is logged (with the step prefix) rather than printed as is.
+    output = _OutputStream(log=True)
+    with (
+        span("bash", "subprocess", script=script, cwd=str(cwd or "")),
+        subprocess.Popen(
+            ["/bin/bash", "-c", script],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            **kwargs,
+        ) as process,
+    ):
+        assert process.stdout
+        _read_outputs({process.stdout: output})
+    if process.returncode:
+        raise subprocess.CalledProcessError(
+            process.returncode, script, output=output.text
+        )
+
+
+async def run_shell_script_async(
+    script: str,
+    *,
+    cwd: Path | str | None = None,
+    extra_env: dict[str, str] | None = None,
+) -> None:
+    script = _make_shell_script(script)
+    kwargs = _get_subprocess_kwargs(cwd=cwd, extra_env=extra_env)
+    logger.debug(
+        "Running shell script",
+        extra={
+            "script": script,
+            "cwd": cwd,
+            "extra_env": extra_env,
+        },
     )
+    with span("bash", "subprocess", script=script, cwd=str(cwd or "")):
+        process = await asyncio.create_subprocess_exec(
+            "/bin/bash",
+            "-c",
+            script,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            **kwargs,
+        )
+        assert process.stdout
+        output = _OutputStream(log=True)
+        await _read_output_async(process.stdout, output)
+        returncode = await process.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, script, output=output.text)
+
+
+class ShellSession:
+    """
+    Long-lived bash process, running scripts one after the other without spawning a
+    new shell for each of them. A script is framed by a unique sentinel line, printed
+    with its exit code once it is done.
+
+    Scripts share the shell state: variables, functions and options set by a script
+    are visible to the next ones. A failing script exits the shell (`set -e`), so the
+    session can't be reused after that.
+    """
+
+    def __init__(self, cwd: Path | str) -> None:
+        self.cwd = str(cwd)
+        self._process = subprocess.Popen(
+            ["/bin/bash"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=self.cwd,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def run(self, script: str, *, extra_env: dict[str, str] | None = None) -> None:
+        assert self._process.stdin and self._process.stdout
+        script = dedent(script).strip()
+        sentinel = random_name("__slowhand_done")
+        frame = [
+            "set -e",
+            f"cd {shlex.quote(self.cwd)}",
+            *(
+                f"export {name}={shlex.quote(value)}"
+                for name, value in (extra_env or {}).items()
+            ),
+            # Scripts must not read the frames of the next scripts.
+            f"eval {shlex.quote(script)} < /dev/null",
+            f"printf '\\n%s %d\\n' {sentinel} $?",
+        ]
+        output = _OutputStream(log=True)
+        returncode: int | None = None
+        with span("bash (session)", "subprocess", script=script, cwd=self.cwd):
+            self._process.stdin.write("\n".join([*frame, ""]).encode())
+            self._process.stdin.flush()
+            # The sentinel follows a newline, in case the output does not end with
+            # one: the last line is held back to drop that newline.
+            last_line = b""
+            while line := self._process.stdout.readline(_MAX_LINE_SIZE):
+                if line.startswith(sentinel.encode()):
+                    returncode = int(line.split()[1])
+                    last_line = last_line.removesuffix(b"\n")
+                    break
+                output.feed(last_line)
+                last_line = line
+            output.feed(last_line)
+            output.flush()
+            if returncode is None:  # the shell exited, e.g. on error
+                returncode = self._process.wait()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, script, output=output.text)
+
+    def close(self) -> None:
+        if self._process.stdin:
+            self._process.stdin.close()
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        if self._process.stdout:
+            self._process.stdout.close()
+
+
+class ShellSessionPool:
+    """
+    Shell sessions of a job run, by working dir. Steps running concurrently get their
+    own sessions.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle_sessions: dict[str, list[ShellSession]] = {}
+        self._sessions: list[ShellSession] = []
+
+    def run_shell_script(
+        self,
+        script: str,
+        *,
+        cwd: Path | str,
+        extra_env: dict[str, str] | None = None,
+    ) -> None:
+        logger.debug(
+            "Running shell script in session",
+            extra={
+                "script": script,
+                "cwd": cwd,
+                "extra_env": extra_env,
+            },
+        )
+        key = str(cwd)
+        with self._lock:
+            idle_sessions = self._idle_sessions.get(key)
+            session = idle_sessions.pop() if idle_sessions else None
+        if session is None:
+            session = ShellSession(cwd)
+            with self._lock:
+                self._sessions.append(session)
+        try:
+            session.run(script, extra_env=extra_env)
+        finally:
+            if session.alive:
+                with self._lock:
+                    self._idle_sessions.setdefault(key, []).append(session)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+            self._idle_sessions.clear()
+        for session in sessions:
+            session.close()
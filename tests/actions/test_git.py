@@ -0,0 +1,43 @@
+from pathlib import Path
+
+from slowhand.actions import create_action
+from slowhand.context import Context
+
+
+def test_sparse_clone_and_push(git_origin_repo, monkeypatch, git):
+    # Redirect the Github URL to the local origin repo.
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+    monkeypatch.setenv("GIT_CONFIG_KEY_0", f"url.file://{git_origin_repo}.insteadOf")
+    monkeypatch.setenv("GIT_CONFIG_VALUE_0", "git@github.com:owner/repo.git")
+
+    context = Context("fake-job-id")
+    outputs = create_action("actions/git-clone").run(
+        {
+            "repo": "owner/repo",
+            "filter": "blob:none",
+            "sparse-paths": ["foo/bar/**"],
+            "single-branch": True,
+            "new-branch": "chore-test",
+        },
+        context=context,
+        dry_run=False,
+    )
+    assert outputs
+    repo_dir = Path(str(outputs["repo_dir"]))
+    assert outputs["head_hash"] == git("rev-parse", "HEAD", cwd=git_origin_repo)
+    assert (repo_dir / "README.md").is_file()
+    assert (repo_dir / "foo" / "bar" / "bar.txt").is_file()
+    assert not (repo_dir / "baz").exists()
+
+    (repo_dir / "foo" / "bar" / "bar.txt").write_text("bar v2")
+    create_action("actions/git-commit-push-branch").run(
+        {"repo-dir": str(repo_dir), "message": "v2", "branch": "chore-test"},
+        context=context,
+        dry_run=False,
+    )
+    # Files out of the sparse checkout are kept in the pushed commit.
+    assert git("ls-tree", "-r", "--name-only", "chore-test", cwd=git_origin_repo) == (
+        "README.md\nbaz/baz.txt\nfoo/bar/bar.txt"
+    )
+    assert git("show", "chore-test:foo/bar/bar.txt", cwd=git_origin_repo) == "bar v2"
+    context.teardown()
@@ -0,0 +1,37 @@
+"""
+Micro-benchmark of the expression lexer and parser, on long generated expressions.
+
+Run with: `pdm run bench`
+"""
+
+import timeit
+
+from slowhand.expression.lexer import tokenize
+from slowhand.expression.parser import parse_to_ast
+
+
+def make_expression(terms: int) -> str:
+    return " || ".join(
+        f'(steps.s{i}.outputs.value == "v{i}" && !inputs.flag{i} && inputs.n != {i})'
+        for i in range(terms)
+    )
+
+
+def main() -> None:
+    for terms in (10, 100, 1000):
+        expression = make_expression(terms)
+        token_count = sum(1 for _ in tokenize(expression))
+        number = max(1, 20_000 // token_count)
+        for name, func in (
+            ("tokenize", lambda e=expression: sum(1 for _ in tokenize(e))),
+            ("tokenize+parse", lambda e=expression: parse_to_ast(tokenize(e))),
+        ):
+            seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+            print(
+                f"{name:>15}: {token_count:>6} tokens, "
+                f"{seconds * 1e6:>9.1f} us, {token_count / seconds:>12,.0f} tokens/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
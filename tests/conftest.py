@@ -1,11 +1,91 @@
-from collections.abc import Generator
+import subprocess
+from collections.abc import Callable, Generator
 from pathlib import Path
+from typing import Any
 
 import pytest
 
+from slowhand.context import Context
+from slowhand.models import Job
+
 _BASE_DIR = Path(__file__).parent.parent.absolute()
 
 
+def _git(*args: str, cwd: Path) -> str:
+    result = subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    )
+    return result.stdout.strip()
+
+
 @pytest.fixture
 def project_dir() -> Generator[Path]:
     yield _BASE_DIR
+
+
+@pytest.fixture(autouse=True)
+def app_user_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[Path]:
+    # Don't touch the real `~/.slowhand` directory.
+    app_user_dir = tmp_path / ".slowhand"
+    monkeypatch.setattr("slowhand.config._APP_USER_DIR", app_user_dir)
+    yield app_user_dir
+
+
+@pytest.fixture
+def context() -> Generator[Context]:
+    context = Context("test-job")
+    yield context
+    context.teardown()
+
+
+@pytest.fixture
+def make_job() -> Callable[..., Job]:
+    """
+    Factory of `test-job` jobs, from their steps and other fields (e.g. `inputs`).
+    """
+
+    def make_job(steps: list[dict], **fields: Any) -> Job:
+        return Job(
+            job_id="test-job",
+            source="<test>",
+            name="Test job",
+            steps=steps,
+            **fields,
+        )
+
+    return make_job
+
+
+@pytest.fixture
+def git() -> Callable[..., str]:
+    """
+    Run a git command in a directory (`cwd`), and return its output.
+    """
+    return _git
+
+
+@pytest.fixture
+def git_origin_repo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """
+    A local git repo with a single commit on `main`, which can be cloned (partially)
+    with a `file://` URL.
+    """
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{name}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{name}_EMAIL", "test@example.com")
+    repo_dir = tmp_path / "origin"
+    repo_dir.mkdir()
+    (repo_dir / "README.md").write_text("v1")
+    (repo_dir / "foo" / "bar").mkdir(parents=True)
+    (repo_dir / "foo" / "bar" / "bar.txt").write_text("bar")
+    (repo_dir / "baz").mkdir()
+    (repo_dir / "baz" / "baz.txt").write_text("baz")
+    for args in (
+        ["init", "--initial-branch", "main"],
+        ["config", "uploadpack.allowFilter", "true"],
+        ["config", "receive.denyCurrentBranch", "ignore"],
+        ["add", "-A"],
+        ["commit", "-m", "v1"],
+    ):
+        _git(*args, cwd=repo_dir)
+    return repo_dir
@@ -0,0 +1,102 @@
+import pytest
+from typer.testing import CliRunner
+
+from slowhand.batch import (
+    BatchRun,
+    load_batch_file,
+    parse_batch_run,
+    run_batch,
+    validate_batch_runs,
+)
+from slowhand.config import get_settings
+from slowhand.errors import SlowhandException
+from slowhand.main import app
+
+
+def test_parse_batch_run():
+    assert parse_batch_run("sample strParam='foo bar' boolParam=yes") == BatchRun(
+        job_id="sample",
+        inputs={"strParam": "foo bar", "boolParam": "yes"},
+    )
+    with pytest.raises(SlowhandException):
+        parse_batch_run("sample strParam")
+
+
+def test_load_jsonl_batch_file(tmp_path):
+    file = tmp_path / "runs.jsonl"
+    file.write_text(
+        '{"job_id": "sample", "inputs": {"boolParam": true, "intParam": 3}}\n'
+        "\n"
+        '{"job_id": "setup"}\n'
+    )
+    assert load_batch_file(file) == [
+        BatchRun(job_id="sample", inputs={"boolParam": "true", "intParam": "3"}),
+        BatchRun(job_id="setup", inputs={}),
+    ]
+
+
+def test_load_csv_batch_file(tmp_path):
+    file = tmp_path / "runs.csv"
+    file.write_text("job_id,strParam,boolParam\nsample,foo,yes\nsample,,no\n")
+    assert load_batch_file(file) == [
+        BatchRun(job_id="sample", inputs={"strParam": "foo", "boolParam": "yes"}),
+        BatchRun(job_id="sample", inputs={"boolParam": "no"}),
+    ]
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch):
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    (jobs_dir / "hello.yaml").write_text(
+        "name: Hello\n"
+        "inputs:\n"
+        "  name: {type: string, required: true}\n"
+        "steps:\n"
+        "  - name: Say hello\n"
+        "    run: echo hello ${{ inputs.name }}\n"
+    )
+    (jobs_dir / "fail.yaml").write_text(
+        "name: Fail\nsteps:\n  - name: Fail\n    run: exit 3\n"
+    )
+    monkeypatch.setattr(get_settings(), "jobs_dirs", [jobs_dir])
+    return jobs_dir
+
+
+def test_run_batch(jobs_dir):
+    runs = [
+        BatchRun(job_id="hello", inputs={"name": "a"}),
+        BatchRun(job_id="fail", inputs={}),
+        BatchRun(job_id="hello", inputs={"name": "b"}),
+    ]
+    results = run_batch(runs, concurrency=2)
+    assert [(r.job_id, r.succeeded) for r in results] == [
+        ("hello", True),
+        ("fail", False),
+        ("hello", True),
+    ]
+    assert "exit status 3" in (results[1].error or "")
+
+
+def test_run_many_summary(jobs_dir):
+    result = CliRunner().invoke(
+        app, ["run-many", "-r", "hello name=a", "-r", "fail", "-j", "2"]
+    )
+    assert result.exit_code == 1
+    assert "Summary" in result.output
+    assert "hello name=a" in result.output
+    assert "ok" in result.output
+    assert "failed" in result.output
+
+    result = CliRunner().invoke(app, ["run-many", "-r", "hello name=a"])
+    assert result.exit_code == 0
+
+
+def test_run_many_validates_runs_first(jobs_dir):
+    with pytest.raises(SlowhandException, match="hello: name: Input is required"):
+        validate_batch_runs([BatchRun(job_id="hello", inputs={})])
+
+    result = CliRunner().invoke(app, ["run-many", "-r", "hello", "-r", "unknown"])
+    assert result.exit_code == 2
+    assert "Input is required" in result.output
+    assert "Traceback" not in result.output
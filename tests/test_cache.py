@@ -0,0 +1,84 @@
+from slowhand.cache import (
+    compute_cache_key,
+    evict_cache,
+    load_cached_outputs,
+    save_cached_outputs,
+)
+from slowhand.config import get_settings
+from slowhand.context import Context
+from slowhand.models import Job
+from slowhand.runner import RunOptions, _run_steps
+
+
+def test_cache_key_depends_on_files(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    key = compute_cache_key("actions/x", {"p": 1}, files=["*.txt"], base_dir=tmp_path)
+    assert key == compute_cache_key(
+        "actions/x", {"p": 1}, files=["*.txt"], base_dir=tmp_path
+    )
+    assert key != compute_cache_key("actions/x", {"p": 2}, files=["*.txt"])
+
+    (tmp_path / "a.txt").write_text("b")
+    assert key != compute_cache_key(
+        "actions/x", {"p": 1}, files=["*.txt"], base_dir=tmp_path
+    )
+
+
+def test_evict_cache(app_user_dir, monkeypatch):
+    monkeypatch.setattr(get_settings().cache, "max_size_mb", 0)
+    save_cached_outputs("abcdef", {"result": "1.2"})
+    assert load_cached_outputs("abcdef") is None
+    assert evict_cache() == 0
+
+    # Saving outputs evicts the cache again only after a while.
+    save_cached_outputs("abcdef", {"result": "1.2"})
+    assert load_cached_outputs("abcdef") == {"result": "1.2"}
+    assert evict_cache() == 1
+
+
+def _run_twice(job: Job, step_id: str) -> list:
+    values = []
+    for _ in range(2):
+        context = Context("test-job")
+        _run_steps(job.steps, context, RunOptions())
+        values.append(context.resolve_variable(f"steps.{step_id}.outputs.value"))
+        context.teardown()
+    return values
+
+
+def test_restore_step_outputs_from_cache(make_job):
+    job = make_job(
+        [
+            {
+                "id": "random",
+                "name": "Random",
+                "run": "echo value=$RANDOM$RANDOM >> $OUTPUT",
+                "cache": True,
+            },
+        ],
+    )
+    values = _run_twice(job, "random")
+    assert values[0] == values[1]
+
+
+def test_restore_outputs_of_step_in_run_dir(make_job):
+    # The working dir and cached files are in the run dir, different in each run.
+    job = make_job(
+        [
+            {
+                "id": "prepare",
+                "name": "Prepare",
+                "run": "mkdir src; echo a > src/a.txt; echo dir=$PWD/src >> $OUTPUT",
+            },
+            {
+                "id": "random",
+                "name": "Random",
+                "working-dir": "${{ steps.prepare.outputs.dir }}",
+                "run": "echo value=$RANDOM$RANDOM >> $OUTPUT",
+                "cache": True,
+                "cache-files": ["*.txt", "${{ steps.prepare.outputs.dir }}/a.txt"],
+            },
+        ],
+    )
+    values = _run_twice(job, "random")
+    assert values[0] == values[1]
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from slowhand.loader import JobSource
+from slowhand.models import RunShell
+
+_JOB = """
+name: Sample
+inputs:
+  name:
+    type: string
+steps:
+  - id: hello
+    name: Say hello
+    run: echo "Hello ${{ inputs.name }}"
+"""
+
+
+def test_load_job_from_catalog(tmp_path, monkeypatch):
+    job_file = tmp_path / "sample.yaml"
+    job_file.write_text(_JOB)
+    job = JobSource(job_file).create_job()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("job file should not be parsed")
+
+    with monkeypatch.context() as m:
+        m.setattr("yaml.safe_load", fail)
+        cached_job = JobSource(job_file).create_job()
+        assert cached_job.model_dump() == job.model_dump()
+        step = cached_job.steps[0]
+        assert isinstance(step, RunShell)
+        assert step.as_use_action_step().params_template["script"].source == (
+            'echo "Hello ${{ inputs.name }}"'
+        )
+
+        # Same content but touched.
+        os.utime(job_file, ns=(0, 0))
+        assert JobSource(job_file).create_job().model_dump() == job.model_dump()
+
+        # Changed content.
+        job_file.write_text(_JOB.replace("Sample", "Changed"))
+        with pytest.raises(AssertionError):
+            JobSource(job_file).create_job()
+
+    assert JobSource(job_file).create_job().name == "Changed"
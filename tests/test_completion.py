@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from slowhand.completion import COMMANDS, complete
+from slowhand.config import get_settings
+from slowhand.main import app
+
+_COMPLETE = """
+import json, sys
+from slowhand.completion import main
+main()
+print(json.dumps(list(sys.modules)))
+"""
+
+
+@pytest.fixture
+def jobs_dir(tmp_path, monkeypatch, app_user_dir):
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    (jobs_dir / "foo.yaml").write_text(
+        "name: Foo\ninputs:\n  who: {type: string}\n  count: {type: int}\nsteps: []\n"
+    )
+    (jobs_dir / "bar.yaml").write_text("name: Bar\nsteps: []\n")
+    monkeypatch.setattr(get_settings(), "jobs_dirs", [jobs_dir])
+    monkeypatch.setattr("slowhand.completion._APP_USER_DIR", app_user_dir)
+    return jobs_dir
+
+
+def test_complete_commands():
+    registered = {
+        command.name or command.callback.__name__.replace("_", "-")
+        for command in app.registered_commands
+        if command.callback
+    }
+    assert set(COMMANDS) == registered
+    assert complete([], "r") == ["run", "resume", "run-many"]
+
+
+def test_complete_job_ids_and_inputs(jobs_dir):
+    assert {"bar", "foo", "sample"} <= set(complete(["run"], ""))
+    assert complete(["show"], "f") == ["foo"]
+    assert complete(["run", "foo"], "") == []
+    assert complete(["run", "foo", "-I"], "") == ["who=", "count="]
+    assert complete(["plan", "--input", "who=x", "foo", "-I"], "c") == ["count="]
+    assert complete(["run", "foo", "-I"], "who=") == []
+    assert complete(["jobs"], "") == []
+
+    # The index is updated when job files change.
+    (jobs_dir / "foo.yaml").write_text(
+        "name: Foo\ninputs:\n  target: {type: string}\nsteps: []\n"
+    )
+    (jobs_dir / "baz.yaml").write_text("name: Baz\nsteps: []\n")
+    (jobs_dir / "bar.yaml").unlink()
+    assert complete(["run", "foo", "-I"], "") == ["target="]
+    assert complete(["run"], "ba") == ["baz"]
+
+
+def test_complete_from_index_is_lazy(jobs_dir, tmp_path):
+    complete(["run"], "")  # build the index
+
+    # `~/.slowhand` is the patched app user dir.
+    env = os.environ | {"HOME": str(tmp_path), "COMP_LINE": "slowhand run fo"}
+    result = subprocess.run(
+        [sys.executable, "-c", _COMPLETE],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    completions, modules = result.stdout.splitlines()
+    assert completions == "foo"
+    assert not {
+        module
+        for module in json.loads(modules)
+        if module.split(".")[0] in ("pydantic", "pydantic_settings", "rich", "yaml")
+    }
@@ -0,0 +1,59 @@
+import pytest
+
+from slowhand.context import Context
+from slowhand.errors import SlowhandException
+from slowhand.journal import read_journal
+
+
+def test_load_checkpoint_from_journal(app_user_dir):
+    context = Context("test-job")
+    context.start_journal()
+    context.save_inputs({"name": "foo"})
+    context.save_step_outputs("a", {"value": 1})
+    context.save_step_outputs("b", {"value": "b"})
+    # Simulate a crash: the journal is never closed, and the last write is torn.
+    journal_file = app_user_dir / "runs" / context.run_id / "journal.jsonl"
+    with journal_file.open("a") as f:
+        f.write('{"set":"steps.c.outputs","val')
+
+    # The run is locked by the crashed process, which is still "alive" in this test.
+    with pytest.raises(SlowhandException):
+        Context.load_checkpoint("test-job")
+    context._release_run_lock()
+
+    loaded = Context.load_checkpoint("test-job")
+    assert loaded.run_id == context.run_id
+    assert loaded.resolve("${{ inputs.name }}-${{ steps.a.outputs.value }}") == "foo-1"
+    assert loaded.has_step_outputs("b")
+    assert not loaded.has_step_outputs("c")
+    # The journal is compacted into a single snapshot.
+    assert len(list(read_journal(journal_file))) == 1
+
+    loaded.save_step_outputs("c", {"value": "c"})
+    loaded.delete_checkpoint()
+    assert not journal_file.parent.exists()
+    with pytest.raises(SlowhandException):
+        Context.load_checkpoint("test-job")
+    context.teardown()
+
+
+def test_load_checkpoint_of_run(app_user_dir):
+    contexts = [Context(job_id) for job_id in ("job-1", "job-1", "job-2")]
+    for context in contexts:
+        context.start_journal()
+        context.save_checkpoint()
+    # Defaults to the latest run of the job.
+    loaded = Context.load_checkpoint("job-1")
+    assert loaded.run_id == contexts[1].run_id
+    # The latest run is now in progress, so skip it.
+    assert Context.load_checkpoint("job-1").run_id == contexts[0].run_id
+    with pytest.raises(SlowhandException):
+        Context.load_checkpoint("job-1", run_id=contexts[1].run_id)
+    with pytest.raises(SlowhandException):
+        Context.load_checkpoint("job-1", run_id=contexts[2].run_id)
+    assert (
+        Context.load_checkpoint("job-2", run_id=contexts[2].run_id).run_id
+        == contexts[2].run_id
+    )
+    for context in contexts:
+        context.teardown()
@@ -0,0 +1,61 @@
+import logging
+import threading
+
+import pytest
+
+from slowhand.client import main as client_main
+from slowhand.client import send_request
+from slowhand.config import get_settings
+from slowhand.daemon import DaemonServer
+from slowhand.errors import SlowhandException
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    (jobs_dir / "hello.yaml").write_text(
+        "name: Hello\n"
+        "inputs:\n"
+        "  who:\n"
+        "    type: string\n"
+        "steps:\n"
+        "  - name: Greet\n"
+        "    id: greet\n"
+        '    run: echo "greeting=hello ${{ inputs.who }}" >> $OUTPUT\n'
+    )
+    monkeypatch.setattr(get_settings(), "jobs_dirs", [jobs_dir])
+    server = DaemonServer(tmp_path / "d.sock", workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_daemon_runs_job(daemon):
+    messages = list(
+        send_request(
+            {"command": "run", "job_id": "hello", "inputs": {"who": "daemon"}},
+            socket_path=daemon.socket_path,
+        )
+    )
+    *logs, result = messages
+    assert all(message["type"] == "log" for message in logs)
+    assert any("Running job: Hello" in message["text"] for message in logs)
+    assert result["type"] == "result"
+    assert result["succeeded"]
+    assert result["job_id"] == "hello"
+
+
+def test_daemon_reports_errors(daemon, capsys):
+    assert client_main(["--socket", str(daemon.socket_path), "ping"]) == 0
+    assert client_main(["--socket", str(daemon.socket_path), "run", "missing"]) == 1
+    assert "Error:" in capsys.readouterr().err
+
+
+def test_daemon_refuses_to_share_socket(daemon):
+    with pytest.raises(SlowhandException, match="already running"):
+        DaemonServer(daemon.socket_path, workers=1)
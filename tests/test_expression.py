@@ -1,4 +1,17 @@
-from slowhand.expression.lexer import tokenize
+import pytest
+
+from slowhand.errors import SlowhandException
+from slowhand.expression import compile_condition, evaluate_condition, fold_condition
+from slowhand.expression.lexer import (
+    AndOrToken,
+    EqNeqToken,
+    LiteralToken,
+    NotToken,
+    ParenToken,
+    StringToken,
+    VariableToken,
+    tokenize,
+)
 from slowhand.expression.parser import parse_to_ast
 
 
@@ -167,3 +180,94 @@ def test_complex_expression():
             },
         },
     }
+
+
+def test_not_and_parentheses_expression():
+    tokens = tokenize("!(a.b == 1 || c.d != true)")
+    ast = parse_to_ast(tokens)
+    assert ast.to_dict() == {
+        "type": "NotNode",
+        "operand": {
+            "type": "AndOrNode",
+            "op": "||",
+            "left": {
+                "type": "EqNeqNode",
+                "op": "==",
+                "left": {"type": "VariableNode", "name": "a.b"},
+                "right": {"type": "LiteralNode", "value": 1},
+            },
+            "right": {
+                "type": "EqNeqNode",
+                "op": "!=",
+                "left": {"type": "VariableNode", "name": "c.d"},
+                "right": {"type": "LiteralNode", "value": True},
+            },
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    "condition",
+    ["(inputs.a", 'inputs.a == "b" "c"', "inputs.a ==", "foo.bar", "inputs.a = 1"],
+)
+def test_invalid_condition(condition):
+    with pytest.raises(ValueError):
+        compile_condition(condition)
+
+
+def test_evaluate_condition(context):
+    context.save_inputs({"flag": False, "count": 3, "name": "foo"})
+    context.save_step_outputs("a", {"value": "3"})
+
+    def evaluate(condition: str) -> bool:
+        return evaluate_condition(condition, context=context)
+
+    assert not evaluate("inputs.flag")
+    assert evaluate("!inputs.flag && inputs.count == 3")
+    assert evaluate('inputs.count == steps.a.outputs.value && inputs.name == "foo"')
+    assert evaluate("inputs.flag == false && (inputs.count != 3 || true)")
+    assert not evaluate("!(inputs.flag || inputs.count == 3)")
+    # Short-circuit: the invalid matrix variable is never evaluated.
+    assert evaluate("inputs.count == 3 || matrix.unknown")
+    assert not evaluate("inputs.flag && matrix.unknown")
+
+
+def test_fold_condition_short_circuits(context):
+    context.save_inputs({"flag": False, "count": 3})
+    for condition in (
+        "inputs.count == 3 || matrix.unknown",
+        "inputs.flag && matrix.unknown",
+        "!inputs.flag || (matrix.unknown && steps.a.outputs.value)",
+    ):
+        assert fold_condition(condition, context=context) is evaluate_condition(
+            condition, context=context
+        )
+    assert fold_condition("steps.a.outputs.value || inputs.count == 3", context=context)
+    assert (
+        fold_condition("steps.a.outputs.value || matrix.unknown", context=context)
+        is None
+    )
+    with pytest.raises(SlowhandException, match="Unknown matrix variable"):
+        fold_condition("!inputs.flag && matrix.unknown", context=context)
+
+
+def test_tokenize():
+    assert list(tokenize('!(inputs.a==-1)&& "x y"||false')) == [
+        NotToken(),
+        ParenToken("("),
+        VariableToken("inputs.a"),
+        EqNeqToken("=="),
+        LiteralToken(-1),
+        ParenToken(")"),
+        AndOrToken("&&"),
+        StringToken("x y"),
+        AndOrToken("||"),
+        LiteralToken(False),
+    ]
+    assert list(tokenize('steps.m.next-2.outputs.v != ""')) == [
+        VariableToken("steps.m.next-2.outputs.v"),
+        EqNeqToken("!="),
+        StringToken(""),
+    ]
+    with pytest.raises(ValueError, match="Invalid token at position 12"):
+        list(tokenize('inputs.a == "unterminated'))
@@ -0,0 +1,21 @@
+from slowhand.config import get_settings
+from slowhand.loader import JobHeader, load_user_jobs
+
+
+def test_load_user_job_headers(tmp_path, monkeypatch):
+    jobs_dirs = [tmp_path / "jobs1", tmp_path / "jobs2", tmp_path / "missing"]
+    for jobs_dir in jobs_dirs[:2]:
+        jobs_dir.mkdir()
+    (jobs_dirs[0] / "foo.yaml").write_text("name: Foo job\nsteps: []\n")
+    # Headers are read without validating the job.
+    (jobs_dirs[0] / "invalid.yaml").write_text("steps: 42\nname: 'Invalid: job'\n")
+    (jobs_dirs[1] / "bar.yaml").write_text("name: >\n  Bar\n  job\nsteps: []\n")
+    (jobs_dirs[1] / "README.md").write_text("name: Not a job\n")
+    monkeypatch.setattr(get_settings(), "jobs_dirs", jobs_dirs)
+
+    headers = sorted(load_user_jobs(), key=lambda header: header.job_id)
+    assert headers == [
+        JobHeader("bar", "Bar job\n", str(jobs_dirs[1] / "bar.yaml")),
+        JobHeader("foo", "Foo job", str(jobs_dirs[0] / "foo.yaml")),
+        JobHeader("invalid", "Invalid: job", str(jobs_dirs[0] / "invalid.yaml")),
+    ]
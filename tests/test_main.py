@@ -0,0 +1,42 @@
+import json
+import subprocess
+import sys
+
+_IMPORT_MAIN = """
+import json, sys, time
+start = time.perf_counter()
+import slowhand.main
+print(json.dumps({"duration": time.perf_counter() - start, "modules": list(sys.modules)}))
+"""
+
+# Heavy modules which are only needed by some commands or actions.
+_LAZY_MODULES = (
+    "jira",
+    "jsonpath_ng",
+    "pydantic",
+    "pydantic_settings",
+    "rich.prompt",
+    "rich.table",
+    "slack_sdk",
+    "yaml",
+    "slowhand.actions",
+    "slowhand.config",
+    "slowhand.models",
+    "slowhand.runner",
+)
+
+
+def test_import_main_is_lazy():
+    result = subprocess.run(
+        [sys.executable, "-c", _IMPORT_MAIN], capture_output=True, text=True, check=True
+    )
+    data = json.loads(result.stdout)
+    imported = {
+        module
+        for module in data["modules"]
+        for lazy_module in _LAZY_MODULES
+        if module == lazy_module or module.startswith(f"{lazy_module}.")
+    }
+    assert not imported
+    # Typically ~0.15s, with a large margin for slow machines.
+    assert data["duration"] < 1.0
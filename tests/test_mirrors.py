@@ -0,0 +1,24 @@
+from slowhand.mirrors import clone_with_mirror, gc_mirrors, get_mirror_dir
+
+
+def test_clone_with_mirror(app_user_dir, git_origin_repo, tmp_path, git):
+    url = f"file://{git_origin_repo}"
+    mirror_dir = get_mirror_dir("owner/repo")
+
+    clone_with_mirror(url, mirror_dir, str(tmp_path / "clone1"), ["--depth", "1"])
+    assert (tmp_path / "clone1" / "README.md").read_text() == "v1"
+    assert (mirror_dir / "HEAD").is_file()
+
+    # A new commit is fetched incrementally in the mirror.
+    (git_origin_repo / "README.md").write_text("v2")
+    git("commit", "-am", "v2", cwd=git_origin_repo)
+    clone_with_mirror(url, mirror_dir, str(tmp_path / "clone2"), [])
+    assert (tmp_path / "clone2" / "README.md").read_text() == "v2"
+    head_hash = git("rev-parse", "HEAD", cwd=git_origin_repo)
+    assert git("rev-parse", "main", cwd=mirror_dir) == head_hash
+
+    # Clones don't depend on the mirror.
+    assert gc_mirrors(max_age_days=1) == []
+    assert gc_mirrors(max_age_days=0) == [mirror_dir]
+    assert not mirror_dir.exists()
+    assert git("log", "--oneline", cwd=tmp_path / "clone2").count("\n") == 1
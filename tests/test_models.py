@@ -1,3 +1,6 @@
+import pytest
+from pydantic import ValidationError
+
 from slowhand.loader import load_job
 from slowhand.models import JobInput
 
@@ -27,3 +30,22 @@ def test_compute_version():
         ),
     }
     assert [step.name for step in job.steps] == ["Clone git repo", "List files"]
+
+
+def test_matrix_on_steps_group_is_rejected(make_job):
+    with pytest.raises(ValidationError, match="Matrix is not supported on steps"):
+        make_job(
+            [
+                {
+                    "id": "g",
+                    "name": "G",
+                    "matrix": {"n": [1, 2]},
+                    "steps": [{"id": "a", "name": "A", "run": "true"}],
+                }
+            ],
+        )
+
+
+def test_max_concurrency_of_single_step_is_rejected(make_job):
+    with pytest.raises(ValidationError, match="max-concurrency is only supported"):
+        make_job([{"id": "a", "name": "A", "max-concurrency": 2, "run": "true"}])
@@ -0,0 +1,68 @@
+from slowhand.planner import iter_pruned_step_ids, plan_steps
+from slowhand.runner import RunOptions, _run_steps, run_job
+
+_INPUTS = {"env": {"type": "string"}, "dry": {"type": "bool", "default": False}}
+
+
+_STEPS: list[dict] = [
+    {"id": "a", "name": "A", "if": 'inputs.env == "prd"', "run": "echo a"},
+    {"id": "b", "name": "B", "if": "!inputs.dry", "run": "echo value=b >> $OUTPUT"},
+    {"id": "c", "name": "C", "if": 'steps.b.outputs.value == "b"', "run": "echo c"},
+    {
+        "id": "d",
+        "name": "D",
+        "if": "inputs.dry || steps.b.outputs.value",
+        "run": "echo d",
+    },
+    {
+        "id": "e",
+        "name": "E",
+        "matrix": {"env": ["stg", "prd"]},
+        "if": "matrix.env == inputs.env",
+        "run": "echo e",
+    },
+    {
+        "id": "f",
+        "name": "F",
+        "if": 'inputs.env != "stg" && steps.b.outputs.value',
+        "steps": [{"id": "g", "name": "G", "if": "matrix.unknown", "run": "echo g"}],
+    },
+]
+
+
+def test_plan_steps(context, make_job):
+    job = make_job(_STEPS, inputs=_INPUTS)
+    context.save_inputs(job.parse_inputs({"env": "stg"}))
+    plans = plan_steps(job.steps, context)
+    assert [(plan.step_id, plan.status) for plan in plans] == [
+        ("a", "skip"),
+        ("b", "run"),
+        ("c", "runtime"),
+        ("d", "runtime"),
+        ("e", "runtime"),
+        ("f", "skip"),
+    ]
+    assert [(plan.step_id, plan.status) for plan in plans[4].children] == [
+        ("e.stg", "run"),
+        ("e.prd", "skip"),
+    ]
+    assert list(iter_pruned_step_ids(plans)) == ["a", "e.prd", "f"]
+
+
+def test_run_job_with_plan(make_job, app_user_dir):
+    result = run_job(make_job(_STEPS, inputs=_INPUTS), {"env": "stg"})
+    assert result.succeeded, result.error
+
+
+def test_pruned_steps_are_not_evaluated(context, make_job):
+    job = make_job(
+        [
+            {
+                "id": "a",
+                "name": "A",
+                "steps": [{"id": "b", "name": "B", "if": "matrix.x", "run": "echo"}],
+            }
+        ]
+    )
+    _run_steps(job.steps, context, RunOptions(pruned_step_ids=frozenset({"a"})))
+    assert not context.has_step_outputs("a")
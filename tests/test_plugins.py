@@ -0,0 +1,63 @@
+import textwrap
+
+import pytest
+
+from slowhand.actions import create_action
+from slowhand.context import Context
+from slowhand.plugins import get_plugin_actions
+
+
+@pytest.fixture
+def plugin_dir(tmp_path, monkeypatch):
+    plugin_dir = tmp_path / "site-packages"
+    dist_info_dir = plugin_dir / "acme_plugin-1.0.dist-info"
+    dist_info_dir.mkdir(parents=True)
+    (dist_info_dir / "METADATA").write_text(
+        "Metadata-Version: 2.1\nName: acme-plugin\nVersion: 1.0\n"
+    )
+    (dist_info_dir / "entry_points.txt").write_text(
+        "[slowhand.actions]\nacme/hello = acme_plugin:Hello\n"
+    )
+    (plugin_dir / "acme_plugin.py").write_text(
+        textwrap.dedent(
+            """
+            from slowhand.actions import Action
+
+            class Hello(Action):
+                name = "hello"
+
+                def run(self, params, *, context, dry_run):
+                    return {"greeting": f"Hello {params['who']}"}
+            """
+        )
+    )
+    monkeypatch.syspath_prepend(plugin_dir)
+    get_plugin_actions.cache_clear()
+    yield plugin_dir
+    get_plugin_actions.cache_clear()
+
+
+def test_plugin_action(plugin_dir, app_user_dir, monkeypatch):
+    context = Context("test-job")
+    action = create_action("acme/hello")
+    assert action.run({"who": "Bob"}, context=context, dry_run=False) == {
+        "greeting": "Hello Bob"
+    }
+    assert (app_user_dir / "plugins.json").is_file()
+
+    # Discovery is cached...
+    def fail(*args, **kwargs):
+        raise AssertionError("entry points should not be scanned")
+
+    get_plugin_actions.cache_clear()
+    with monkeypatch.context() as m:
+        m.setattr("slowhand.plugins.entry_points", fail)
+        assert get_plugin_actions()["acme/hello"] == "acme_plugin:Hello"
+
+    # ... until a distribution is removed.
+    for file in (plugin_dir / "acme_plugin-1.0.dist-info").iterdir():
+        file.unlink()
+    (plugin_dir / "acme_plugin-1.0.dist-info").rmdir()
+    get_plugin_actions.cache_clear()
+    assert "acme/hello" not in get_plugin_actions()
+    context.teardown()
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import pstats
+
+import pytest
+
+from slowhand.profiling import get_profiles_dir, log_profile_report
+from slowhand.runner import RunOptions, _run_steps, _run_steps_async
+
+
+@pytest.mark.parametrize("interval", [None, 0.005])
+def test_profile_steps(context, make_job, caplog, interval):
+    job = make_job(
+        [
+            {"id": "a", "name": "A", "run": "sleep 0.1"},
+            {"id": "b", "name": "B", "run": "sleep 0.05"},
+        ],
+    )
+    options = RunOptions(profile=True, profile_interval=interval)
+    _run_steps(job.steps, context, options)
+
+    profiles_dir = get_profiles_dir(context.run_dir)
+    assert sorted(f.name for f in profiles_dir.iterdir()) == [
+        "a.pstats",
+        "b.pstats",
+    ]
+    stats = pstats.Stats(str(profiles_dir / "a.pstats"))
+    assert stats.total_tt > 0  # type: ignore[attr-defined]
+
+    caplog.set_level(logging.INFO)
+    log_profile_report(profiles_dir)
+    assert "Top functions of 2 profiled step(s)" in caplog.text
+
+
+def test_sample_async_steps(context, make_job):
+    # Steps share the event loop thread: their samples are those of the event loop.
+    job = make_job(
+        [
+            {"id": "a", "name": "A", "run": "sleep 0.2"},
+            {"id": "b", "name": "B", "run": "sleep 0.2"},
+        ],
+    )
+    options = RunOptions(
+        max_parallel=2, use_async=True, profile=True, profile_interval=0.005
+    )
+    asyncio.run(_run_steps_async(job.steps, context, options))
+
+    profiles_dir = get_profiles_dir(context.run_dir)
+    for step_id in ("a", "b"):
+        stats = pstats.Stats(str(profiles_dir / f"{step_id}.pstats"))
+        functions = {name for _, _, name in stats.stats}  # type: ignore[attr-defined]
+        assert "_run_once" in functions
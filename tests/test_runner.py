@@ -0,0 +1,254 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from slowhand.context import Context
+from slowhand.errors import SlowhandException
+from slowhand.metrics import format_metrics_table
+from slowhand.runner import RunOptions, _run_steps, _run_steps_async, run_job
+from slowhand.utils import ShellSessionPool
+
+
+def _wait_for_steps(name: str, names: list[str]) -> str:
+    """
+    Shell script marking a step as started and waiting (5s at most) for the others,
+    failing unless they all run at the same time.
+    """
+    all_started = " && ".join(f"[ -e started-{n} ]" for n in names)
+    return (
+        f"touch started-{name}; "
+        f"for _ in $(seq 100); do {all_started} && break; sleep 0.05; done; "
+        f"{all_started}"
+    )
+
+
+def test_run_independent_steps_in_parallel(context, make_job):
+    job = make_job(
+        [
+            {
+                "id": "a",
+                "name": "A",
+                "run": _wait_for_steps("a", ["a", "b"]) + "; echo value=a >> $OUTPUT",
+            },
+            {
+                "id": "b",
+                "name": "B",
+                "run": _wait_for_steps("b", ["a", "b"]) + "; echo value=b >> $OUTPUT",
+            },
+            {
+                "id": "c",
+                "name": "C",
+                "run": (
+                    'echo "value=${{ steps.a.outputs.value }}'
+                    '${{ steps.b.outputs.value }}" >> $OUTPUT'
+                ),
+            },
+        ]
+    )
+    _run_steps(job.steps, context, RunOptions(max_parallel=2))
+    assert context.resolve_variable("steps.c.outputs.value") == "ab"
+
+
+def test_failed_step_stops_scheduling(context, make_job):
+    job = make_job(
+        [
+            {"id": "a", "name": "A", "run": "sleep 0.3; echo value=a >> $OUTPUT"},
+            {"id": "b", "name": "B", "run": "exit 1"},
+            {"id": "c", "name": "C", "uses": "actions/abort", "with": {"message": "x"}},
+            {"id": "d", "name": "D", "run": "echo value=d >> $OUTPUT"},
+        ]
+    )
+    # Steps are started in file order: `d` is never started once `b` or `c` fails,
+    # and the first failure in file order (`b`, not the abort of `c`) is reported.
+    with pytest.raises(subprocess.CalledProcessError, match="exit status 1"):
+        _run_steps(job.steps, context, RunOptions(max_parallel=3))
+    assert context.has_step_outputs("a")
+    assert not context.has_step_outputs("d")
+
+
+def test_run_parallel_group(context, make_job):
+    abc = ["a", "b", "c"]
+    job = make_job(
+        [
+            {
+                "name": "Group",
+                "parallel": True,
+                "fail-fast": False,
+                "steps": [
+                    {"id": "a", "name": "A", "run": _wait_for_steps("a", abc)},
+                    {
+                        "id": "b",
+                        "name": "B",
+                        "run": _wait_for_steps("b", abc) + "; exit 1",
+                    },
+                    {"id": "c", "name": "C", "run": _wait_for_steps("c", abc)},
+                ],
+            },
+        ]
+    )
+    with pytest.raises(subprocess.CalledProcessError, match="exit status 1"):
+        _run_steps(job.steps, context, RunOptions())
+    # All the children are waited for, and the finished ones are recorded.
+    assert context.has_step_outputs("a")
+    assert not context.has_step_outputs("b")
+    assert context.has_step_outputs("c")
+
+
+def test_run_parallel_group_fail_fast(context, make_job):
+    job = make_job(
+        [
+            {
+                "name": "Group",
+                "parallel": True,
+                "max-concurrency": 2,
+                "steps": [
+                    {"id": "a", "name": "A", "run": "sleep 0.3"},
+                    {"id": "b", "name": "B", "run": "exit 1"},
+                    {"id": "c", "name": "C", "run": "true"},
+                ],
+            },
+        ]
+    )
+    with pytest.raises(subprocess.CalledProcessError, match="exit status 1"):
+        _run_steps(job.steps, context, RunOptions())
+    assert context.has_step_outputs("a")
+    assert not context.has_step_outputs("c")
+
+
+def test_run_matrix_step(context, make_job):
+    job = make_job(
+        [
+            {
+                "id": "m",
+                "name": "Matrix",
+                "matrix": {"env": ["next", "load"], "n": [1, 2]},
+                "if": 'matrix.env != "load" || matrix.n == "2"',
+                "run": _wait_for_steps(
+                    "${{ matrix.env }}${{ matrix.n }}", ["next1", "next2", "load2"]
+                )
+                + '; echo "value=${{ matrix.env }}${{ matrix.n }}" >> $OUTPUT',
+            },
+            {
+                "id": "c",
+                "name": "C",
+                "run": 'echo "value=${{ steps.m.next-2.outputs.value }}" >> $OUTPUT',
+            },
+            {
+                "id": "d",
+                "name": "D",
+                "if": 'steps.m.next-2.outputs.value == "next2"',
+                "run": "echo value=d >> $OUTPUT",
+            },
+        ]
+    )
+    _run_steps(job.steps, context, RunOptions())
+    assert context.resolve_variable("steps.m.next-1.outputs.value") == "next1"
+    assert not context.has_step_outputs("m.load-1")
+    assert context.resolve_variable("steps.m.load-2.outputs.value") == "load2"
+    assert context.resolve_variable("steps.c.outputs.value") == "next2"
+    assert context.resolve_variable("steps.d.outputs.value") == "d"
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_matrix_concurrency_is_capped(context, make_job, use_async):
+    job = make_job(
+        [
+            {
+                "id": "m",
+                "name": "Matrix",
+                "matrix": {"n": [1, 2, 3, 4, 5]},
+                "max-concurrency": 2,
+                "run": (
+                    "touch running-${{ matrix.n }}; sleep 0.1; "
+                    "echo running=$(ls running-* | wc -l) >> $OUTPUT; "
+                    "rm running-${{ matrix.n }}"
+                ),
+            }
+        ]
+    )
+    if use_async:
+        asyncio.run(_run_steps_async(job.steps, context, RunOptions()))
+    else:
+        _run_steps(job.steps, context, RunOptions())
+    running = [
+        int(context.resolve_variable(f"steps.m.{n}.outputs.running"))
+        for n in range(1, 6)
+    ]
+    assert max(running) <= 2
+
+
+def test_run_steps_async(context, make_job):
+    job = make_job(
+        [
+            {
+                "id": "a",
+                "name": "A",
+                "run": _wait_for_steps("a", ["a", "c"]) + "; echo value=a >> $OUTPUT",
+            },
+            {
+                "id": "b",
+                "name": "B",
+                "uses": "actions/compute-version",  # blocking action run in a thread
+                "with": {"input": "1.2", "add-minor": 1},
+            },
+            {
+                "id": "c",
+                "name": "C",
+                "run": _wait_for_steps("c", ["a", "c"]) + "; echo value=c >> $OUTPUT",
+            },
+        ]
+    )
+    asyncio.run(_run_steps_async(job.steps, context, RunOptions(max_parallel=3)))
+    assert context.resolve_variable("steps.a.outputs.value") == "a"
+    assert context.resolve_variable("steps.b.outputs.result") == "1.3"
+    assert context.resolve_variable("steps.c.outputs.value") == "c"
+
+
+def test_run_shell_steps_in_persistent_session(context, make_job):
+    job = make_job(
+        [
+            {"id": "a", "name": "A", "run": "export FOO=foo; echo pid=$$ >> $OUTPUT"},
+            {"id": "b", "name": "B", "run": "echo pid=$$ foo=$FOO >> $OUTPUT"},
+        ]
+    )
+    context.shell_sessions = ShellSessionPool()
+    try:
+        _run_steps(job.steps, context, RunOptions())
+    finally:
+        context.shell_sessions.close()
+    pid = context.resolve_variable("steps.a.outputs.pid")
+    assert context.resolve_variable("steps.b.outputs.pid") == f"{pid} foo=foo"
+
+
+def test_record_step_metrics(context, make_job):
+    job = make_job(
+        [
+            {"id": "a", "name": "A", "run": "sleep 0.2; echo value=a >> $OUTPUT"},
+            {
+                "id": "b",
+                "name": "B",
+                "matrix": {"n": [1, 2]},
+                "run": "echo value=${{ matrix.n }} >> $OUTPUT",
+            },
+            {"id": "c", "name": "C", "if": "false", "run": "exit 1"},
+        ]
+    )
+    _run_steps(job.steps, context, RunOptions())
+    metrics = context.get_step_metrics()
+    assert sorted(metrics) == ["a", "b.1", "b.2"]
+    assert metrics["a"]["wall_ms"] >= 200
+    assert metrics["a"]["user_cpu_ms"] >= 0
+    assert context.resolve_variable("steps.b.1.outputs.value") == "1"
+
+    table = format_metrics_table(metrics).splitlines()
+    assert table[0].startswith("STEP")
+    assert sorted(line.split()[0] for line in table[1:]) == ["a", "b.1", "b.2"]
+
+
+def test_invalid_inputs_leave_no_checkpoint(make_job, app_user_dir):
+    job = make_job([{"id": "a", "name": "A", "run": "true"}])
+    with pytest.raises(SlowhandException, match="Unknown input name"):
+        run_job(job, {"nope": "1"})
+    with pytest.raises(SlowhandException, match="No checkpoint found"):
+        Context.load_checkpoint("test-job")
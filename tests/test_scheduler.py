@@ -0,0 +1,67 @@
+from slowhand.loader import load_job
+from slowhand.scheduler import StepQueue, build_dependencies
+
+
+def test_build_dependencies():
+    # See: `jobs/revault-dev-to-stg.yaml`
+    job = load_job("revault-dev-to-stg")
+    assert build_dependencies(job.steps) == [
+        set(),  # revault: clone
+        set(),  # sre-argocd: clone
+        {1},  # find versions <- sre-argocd
+        {1, 2},  # new release cycle <- find versions, sre-argocd
+        {0, 1, 3},  # patch argocd preset <- revault, sre-argocd
+        {1, 4},  # commit and push <- sre-argocd
+        {1, 5},  # create PR <- sre-argocd
+    ]
+
+
+def test_build_dependencies_on_nested_steps(make_job):
+    job = make_job(
+        [
+            {
+                "id": "g",
+                "name": "G",
+                "steps": [
+                    {"id": "inner", "name": "Inner", "run": "echo v=1 >> $OUTPUT"},
+                    {
+                        "id": "m",
+                        "name": "M",
+                        "matrix": {"n": [1, 2]},
+                        "run": "echo v=$n >> $OUTPUT",
+                    },
+                ],
+            },
+            {"id": "a", "name": "A", "run": "echo ${{ steps.inner.outputs.v }}"},
+            {"id": "b", "name": "B", "run": "echo ${{ steps.m.1.outputs.v }}"},
+        ],
+    )
+    assert build_dependencies(job.steps) == [
+        set(),
+        {0},  # A <- inner in G
+        {0, 1},  # B <- m in G, A (latest consumer of G)
+    ]
+
+
+def test_step_queue_keeps_file_order():
+    queue = StepQueue([set(), set(), {0}, set()])
+    assert queue.take_ready(2) == [0, 1]
+    assert queue.take_ready(2) == []
+    queue.complete(1)
+    assert queue.take_ready(2) == [3]
+    queue.complete(0)
+    assert queue.take_ready(2) == [2]
+
+
+def test_step_queue_stops_after_failure():
+    queue = StepQueue([set(), set(), set()])
+    assert queue.take_ready(2) == [0, 1]
+    queue.complete(1, ValueError("second"))
+    queue.complete(0, ValueError("first"))
+    assert queue.take_ready(2) == []
+    try:
+        queue.raise_first_error()
+    except ValueError as exc:
+        assert str(exc) == "first"
+    else:
+        assert False, "should have raised"
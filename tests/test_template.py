@@ -0,0 +1,38 @@
+import pytest
+from pydantic import ValidationError
+
+from slowhand.errors import SlowhandException
+from slowhand.template import Template, VariableRef, compile_template
+
+
+def test_compile_template():
+    assert compile_template("no variables") == "no variables"
+    template = compile_template("cd ${{ steps.clone.outputs.repo_dir }} && ls")
+    assert isinstance(template, Template)
+    assert template.segments == (
+        "cd ",
+        VariableRef(
+            "steps.clone.outputs.repo_dir", ("steps", "clone", "outputs", "repo_dir")
+        ),
+        " && ls",
+    )
+    with pytest.raises(SlowhandException):
+        compile_template("${{ foo.bar }}")
+
+
+def test_render_templates(context):
+    context.save_inputs({"name": "foo", "count": 3, "flag": None})
+    context.save_step_outputs("a", {"value": "bar"})
+    params = {
+        "a": "${{ inputs.name }}-${{ steps.a.outputs.value }}",
+        "b": ["${{inputs.count}}", "${{ inputs.flag }}", "${{ steps.b.outputs.x }}"],
+        "c": 42,
+    }
+    assert context.resolve(params) == {"a": "foo-bar", "b": ["3", "", ""], "c": 42}
+
+
+def test_malformed_references_fail_at_load(make_job):
+    with pytest.raises(ValidationError, match="Invalid variable name: input.name"):
+        make_job(
+            [{"name": "A", "run": "echo ${{ input.name }}"}],
+        )
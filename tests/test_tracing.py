@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+import pytest
+
+from slowhand.runner import RunOptions, _run_steps, _run_steps_async
+from slowhand.tracing import span, tracing
+
+
+def _assert_nested(events: list[dict]) -> None:
+    # Spans of a lane must be nested: ends of enclosing spans are stacked.
+    by_lane: dict[int, list[dict]] = {}
+    for event in events:
+        by_lane.setdefault(event["tid"], []).append(event)
+    for lane_events in by_lane.values():
+        ends: list[float] = []
+        for event in sorted(lane_events, key=lambda e: (e["ts"], -e["dur"])):
+            while ends and ends[-1] <= event["ts"]:
+                ends.pop()
+            end = event["ts"] + event["dur"]
+            assert not ends or end <= ends[-1]
+            ends.append(end)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_trace_steps(context, make_job, tmp_path, use_async):
+    job = make_job(
+        [
+            {"id": "a", "name": "A", "run": "sleep 0.2"},
+            {"id": "b", "name": "B", "matrix": {"n": [1, 2]}, "run": "sleep 0.1"},
+            {"id": "c", "name": "C", "run": "true"},
+        ],
+    )
+    trace_file = tmp_path / "trace.json"
+    options = RunOptions(max_parallel=2)
+    with tracing(trace_file):
+        if use_async:
+            asyncio.run(_run_steps_async(job.steps, context, options))
+        else:
+            _run_steps(job.steps, context, options)
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert sorted(e["name"] for e in spans if e["cat"] == "step") == [
+        "A",
+        "B",
+        "B (1)",
+        "B (2)",
+        "C",
+    ]
+    assert len([e for e in spans if e["cat"] == "subprocess"]) == 4
+    _assert_nested(spans)
+
+
+def test_span_is_noop_when_disabled():
+    assert span("foo", "test") is span("bar", "test", x=1)
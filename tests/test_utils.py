@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import subprocess
+
+import pytest
+
+from slowhand.logging import log_prefix
+from slowhand.utils import (
+    ShellSessionPool,
+    run_command,
+    run_command_async,
+    run_shell_script,
+    run_shell_script_async,
+)
+
+
+@pytest.fixture
+def caplog(caplog):
+    caplog.set_level(logging.INFO)
+    return caplog
+
+
+def _log_lines(caplog) -> list[str]:
+    return [record.getMessage() for record in caplog.records]
+
+
+def test_run_command_streams_output(caplog):
+    script = "echo out; echo err >&2; echo out2"
+    with log_prefix("step"):
+        output = run_command("bash", "-c", script, stream=True)
+    assert output == "out\nout2"
+    assert len(_log_lines(caplog)) == 3
+    assert all("[step]" in line for line in _log_lines(caplog))
+
+    caplog.clear()
+    assert run_command("bash", "-c", script) == "out\nout2"
+    assert not _log_lines(caplog)
+
+
+def test_run_shell_script_keeps_output_tail(caplog):
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        run_shell_script("seq 1 1000; printf 'no newline'; exit 3")
+    assert exc_info.value.returncode == 3
+    tail = exc_info.value.output.splitlines()
+    assert tail[0] == "902"
+    assert tail[-1] == "no newline"
+    assert len(_log_lines(caplog)) == 1001
+
+
+def test_run_async_streams_output(caplog):
+    async def run():
+        output = await run_command_async("echo", "[red]out")
+        await run_shell_script_async("echo '[red]x'; echo y >&2")
+        return output
+
+    assert asyncio.run(run()) == "[red]out"
+    assert _log_lines(caplog) == ["\\[red]x", "y"]
+
+
+def test_shell_session_pool(tmp_path, caplog):
+    pool = ShellSessionPool()
+    try:
+        pool.run_shell_script("FOO=foo; cd /; printf 'no newline'", cwd=tmp_path)
+        pool.run_shell_script("echo $FOO; pwd", cwd=tmp_path)
+        assert _log_lines(caplog) == ["no newline", "foo", str(tmp_path)]
+
+        # The failed session is replaced by a new one.
+        with pytest.raises(subprocess.CalledProcessError) as exc_info:
+            pool.run_shell_script("echo failing; false; echo unreachable", cwd=tmp_path)
+        assert exc_info.value.returncode == 1
+        assert exc_info.value.output == "failing"
+        caplog.clear()
+        pool.run_shell_script('echo "${FOO:-unset}"', cwd=tmp_path)
+        assert _log_lines(caplog) == ["unset"]
+    finally:
+        pool.close()